@@ -0,0 +1,20 @@
+import sys
+import os
+
+# Base directory
+base_dir = os.path.dirname(os.path.abspath(__file__))
+# Backend directory
+backend_dir = os.path.join(base_dir, 'backend')
+
+# Add backend to path so that 'from async_app import app' works
+# and internal backend imports work as well.
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+# Import the ASGI app wrapping the Flask routes (backend/async_app.py)
+from async_app import app
+
+if __name__ == '__main__':
+    import uvicorn
+    port = int(os.environ.get('PORT', 5000))
+    uvicorn.run(app, host='0.0.0.0', port=port)
@@ -1,24 +1,172 @@
-from flask import Flask, request, jsonify, send_from_directory, Response
+from flask import Flask, request, jsonify, send_from_directory, Response, g
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
-import pandas as pd
 import numpy as np
 import os
 import io
 import csv
+import json
+import itertools
+import functools
+import base64
+import zlib
+import time
 
 # Import our new modules
-from database import init_db, add_students, get_all_students, get_student_dataframe, clear_data
-from model import StudentModel
+from database import (
+    init_db, close_connection, get_training_sample, get_training_job, get_dashboard_summary,
+    get_category_counts, get_random_sample, count_students, get_students_page,
+    iter_students, iter_student_batches,
+    get_binned_counts, get_stable_sample, get_data_version, get_segments, STUDENT_COLUMNS
+)
+from model import StudentModel, upload_sample_size
+from jobs import TrainingWorker
+from features import FEATURES, scatter_points, binned_points
+from segments import SEGMENT_DIMENSIONS
+from scenarios import parse_changes, feature_chunks, run_scenario
+import metrics
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """JSON provider that times response serialization"""
+
+    def dumps(self, obj, **kwargs):
+        with metrics.timer('serialize'):
+            return super().dumps(obj, **kwargs)
 
 app = Flask(__name__, 
             static_folder=os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'frontend')), 
             static_url_path='')
+app.json = TimedJSONProvider(app)
 # Enable CORS for frontend communication
 CORS(app)
 
-# Initialize
-init_db()
-student_model = StudentModel()
+# Nothing heavy runs at import: the schema is created on first database use
+# and the model read on first use, or both up front by warm_up()
+student_model = StudentModel(load=False)
+training_worker = TrainingWorker()
+
+def initialize():
+    """Create or migrate the database schema now rather than on first use"""
+    init_db()
+
+def warm_up():
+    """Do the work otherwise deferred to first use
+
+    Initializes the database, loads the model and imports the libraries
+    only some routes need. Called in the gunicorn master when preloading
+    (see gunicorn.conf.py) so forked workers share all of it copy-on-write;
+    this thread's SQLite connection is closed so none crosses the fork.
+    """
+    initialize()
+    import pandas
+    import ingest
+    student_model.refresh()
+    close_connection()
+
+PREDICTION_FIELDS = FEATURES
+
+# (minimum score, risk_level, status, recommendation, color), best tier first
+PREDICTION_TIERS = [
+    (75, 'Low', 'High Success Probability',
+     'Student is on track for excellent performance!', 'success'),
+    (50, 'Medium', 'Moderate Success Probability',
+     'Student may need additional support in some areas.', 'warning'),
+    (-np.inf, 'High', 'At-Risk Student',
+     'Immediate intervention recommended.', 'danger')
+]
+
+# (field, threshold, message): the insight applies when field < threshold
+INSIGHT_RULES = [
+    ('attendance', 75, 'Low attendance - recommend counseling'),
+    ('study_hours', 10, 'Insufficient study hours - suggest study plan'),
+    ('assignments_completed', 70, 'Low assignment completion - check engagement'),
+    ('previous_grades', 60, 'Struggling academically - consider tutoring')
+]
+
+# Scatter series on the analytics page: name -> (x column, y column)
+SCATTER_SERIES = {
+    'attendance_vs_performance': ('attendance', 'performance'),
+    'study_hours_vs_performance': ('study_hours', 'performance'),
+    'grades_vs_assignments': ('previous_grades', 'assignments_completed')
+}
+# binned: 2D histogram cells; sample: deterministic hashed-id sample;
+# random: a fresh random sample per request
+SCATTER_MODES = ['binned', 'sample', 'random']
+# Default and maximum cells per axis (binned) and points (sample, random)
+SCATTER_BINS = 30
+SCATTER_MAX_BINS = 200
+SCATTER_SAMPLE_SIZE = 500
+SCATTER_MAX_SAMPLE_SIZE = 5000
+
+# Default and maximum page sizes for /api/students
+STUDENTS_PAGE_SIZE = 100
+STUDENTS_MAX_PAGE_SIZE = 1000
+
+# Rows serialized per chunk when streaming batch predictions
+BATCH_STREAM_CHUNK = 1000
+
+# Default and maximum students listed as changing risk level by a scenario
+SCENARIO_LIST_SIZE = 100
+SCENARIO_MAX_LIST_SIZE = 10000
+
+@app.before_request
+def start_request_timer():
+    g.timings = metrics.begin_request()
+
+@app.after_request
+def record_request_metrics(response):
+    """Record latency, size and rows once the response body has been sent
+
+    Streamed bodies are wrapped so their generation time counts as
+    serialization and the request is recorded after the last chunk.
+    Server-Timing (METRICS_SERVER_TIMING=1) can only report the stages
+    finished before the headers go out.
+    """
+    timings = g.get('timings')
+    if timings is None:
+        return response
+    if metrics.SERVER_TIMING:
+        response.headers['Server-Timing'] = timings.server_timing()
+    endpoint, method, status = request.endpoint, request.method, response.status_code
+
+    # File responses keep their passthrough body so sendfile still applies
+    if not response.is_streamed or response.direct_passthrough:
+        metrics.end_request(timings, endpoint, method, status, response.content_length or 0)
+        return response
+
+    body = response.response
+
+    def instrumented():
+        # One serialize observation for the whole stream, not one per chunk;
+        # cursor fetches inside the stream already count as db_read
+        nbytes, elapsed = 0, 0.0
+        try:
+            iterator = iter(body)
+            while True:
+                db_before = timings.stages.get('db_read', 0)
+                start = time.perf_counter()
+                chunk = next(iterator, None)
+                elapsed += time.perf_counter() - start
+                elapsed -= timings.stages.get('db_read', 0) - db_before
+                if chunk is None:
+                    break
+                if isinstance(chunk, str):
+                    chunk = chunk.encode()
+                nbytes += len(chunk)
+                yield chunk
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
+            metrics.record_stage('serialize', elapsed)
+            metrics.end_request(timings, endpoint, method, status, nbytes)
+
+    response.response = instrumented()
+    return response
+
+@app.route('/api/metrics')
+def metrics_endpoint():
+    """Request and stage timings in the Prometheus text format"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/')
 def home():
@@ -49,116 +197,74 @@ def upload_data():
         if not file.filename.endswith('.csv'):
             return jsonify({'error': 'Only CSV files allowed'}), 400
         
-        df = pd.read_csv(file)
-        
-        # --- Mapping Logic for sample_data.csv ---
-        # Map CSV columns to our internal schema
-        column_mapping = {
-            'StudentID': 'student_id',
-            'AttendanceRate': 'attendance',
-            'StudyHoursPerWeek': 'study_hours',
-            'PreviousGPA': 'previous_grades',
-            'AssignmentScore': 'assignments_completed',
-            'ParticipationScore': 'participation',
-            'Major': 'major',
-            'YearOfStudy': 'year_of_study',
-            'Gender': 'gender',
-            'Ethnicity': 'ethnicity',
-            'ParentEducation': 'parent_education',
-            'FamilyIncome': 'family_income'
-        }
-        
-        # Check if it's the new format
-        if 'StudentID' in df.columns:
-            df = df.rename(columns=column_mapping)
-            
-            # Normalize GPA (4.0 scale) to percentage (100 scale)
-            # Assuming max GPA is 4.0
-            if 'previous_grades' in df.columns:
-                df['previous_grades'] = df['previous_grades'] * 25
-                
-            # Normalize Participation Score (0-100) to 1-3 Level
-            # 0-60: Low (1), 60-85: Medium (2), 85-100: High (3)
-            if 'participation' in df.columns:
-                conditions = [
-                    (df['participation'] < 60),
-                    (df['participation'] >= 60) & (df['participation'] < 85),
-                    (df['participation'] >= 85)
-                ]
-                choices = [1, 2, 3]
-                df['participation'] = np.select(conditions, choices, default=2)
-
-        # Fallback for old simple format (validation)
-        required_cols = ['student_id', 'attendance', 'study_hours', 
-                        'previous_grades', 'assignments_completed']
-        
-        missing_cols = [col for col in required_cols if col not in df.columns]
-        if missing_cols:
-            return jsonify({
-                'error': f'Missing required columns: {", ".join(missing_cols)}'
-            }), 400
-        
-        # --- Data Cleaning ---
-        # Fill missing numeric values with mean
-        numeric_cols = ['attendance', 'study_hours', 'previous_grades', 'assignments_completed']
-        for col in numeric_cols:
-             if col in df.columns:
-                 df[col] = df[col].fillna(df[col].mean())
-        
-        if 'participation' not in df.columns:
-            df['participation'] = np.random.randint(1, 4, size=len(df))
-            
-        # Ensure new demographic columns exist even if not in input (for old CSVs)
-        for col in ['major', 'year_of_study', 'gender', 'ethnicity', 'parent_education', 'family_income']:
-            if col not in df.columns:
-                df[col] = 'Unknown'
-
-        # --- Performance Calculation ---
-        if 'performance' not in df.columns or df['performance'].isnull().any():
-             df['performance'] = (
-                df['attendance'] * 0.25 +
-                df['study_hours'] * 3 * 0.20 +
-                df['previous_grades'] * 0.30 +
-                df['assignments_completed'] * 0.15 +
-                (df['participation'] / 3 * 100) * 0.10
-            )
-        
-        # Clip performance to 0-100
-        df['performance'] = df['performance'].clip(0, 100)
+        from ingest import ingest_csv
 
-        # --- Risk Assessment ---
-        df['risk_level'] = df['performance'].apply(
-            lambda x: 'Low' if x >= 70 else 'Medium' if x >= 50 else 'High'
-        )
-        
-        # --- Persistence ---
-        # Select only columns that exist in our DB schema to avoid errors
-        # (Assuming add_students handles extra columns gracefully or we filter them)
-        count = add_students(df)
+        # Read, clean and persist the file chunk by chunk, keeping only the
+        # sample of it the training policy needs
+        result = ingest_csv(file, upload_sample_size())
         
-        # Train Model
-        all_students_df = get_student_dataframe()
-        student_model.train(all_students_df)
+        # Update Model in the background (reads the full table only when a refit is due)
+        job_id = training_worker.submit(
+            student_model.train_incremental, result['new_rows'], get_training_sample
+        )
         
         return jsonify({
             'message': 'Data uploaded successfully',
-            'total_students': count,
-            'columns': list(df.columns)
+            'total_students': result['total'],
+            'inserted': result['inserted'],
+            'updated': result['updated'],
+            'skipped': result['skipped'],
+            'training_job_id': job_id,
+            'training_status_url': f'/api/train/status/{job_id}',
+            'columns': result['columns']
         }), 200
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/train/status/<job_id>', methods=['GET'])
+def training_status(job_id):
+    """Report the progress of a background training job"""
+    try:
+        job = get_training_job(job_id)
+        if job is None:
+            return jsonify({'error': 'Unknown training job'}), 404
+        return jsonify(job), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def missing_prediction_fields(data):
+    """Model inputs absent from a prediction request body"""
+    return [f for f in PREDICTION_FIELDS if f not in data]
+
+def prediction_payload(data, predicted_score):
+    """Response body for a single prediction: score, risk tier and insights"""
+    tier = next(t for t in PREDICTION_TIERS if predicted_score >= t[0])
+    _, risk_level, status, recommendation, color = tier
+    
+    insights = [
+        message for field, threshold, message in INSIGHT_RULES
+        if data[field] < threshold
+    ]
+    
+    return {
+        'predicted_score': round(predicted_score, 2),
+        'risk_level': risk_level,
+        'status': status,
+        'recommendation': recommendation,
+        'color': color,
+        'insights': insights
+    }
+
 @app.route('/api/predict', methods=['POST'])
 def predict():
     """Predict student performance"""
     try:
         data = request.json
         
-        required_fields = ['attendance', 'study_hours', 'previous_grades', 
-                          'assignments_completed', 'participation']
-        
-        missing_fields = [f for f in required_fields if f not in data]
+        missing_fields = missing_prediction_fields(data)
         if missing_fields:
             return jsonify({
                 'error': f'Missing fields: {", ".join(missing_fields)}'
@@ -167,166 +273,399 @@ def predict():
         # Use our model class for prediction
         predicted_score = student_model.predict(data)
         
-        if predicted_score >= 75:
-            risk_level = 'Low'
-            status = 'High Success Probability'
-            recommendation = 'Student is on track for excellent performance!'
-            color = 'success'
-        elif predicted_score >= 50:
-            risk_level = 'Medium'
-            status = 'Moderate Success Probability'
-            recommendation = 'Student may need additional support in some areas.'
-            color = 'warning'
+        return jsonify(prediction_payload(data, predicted_score)), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/predict/cache', methods=['GET'])
+def prediction_cache_stats():
+    """Report prediction cache hit/miss counters"""
+    try:
+        return jsonify(student_model.cache.stats()), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/predict/batch', methods=['POST'])
+def predict_batch():
+    """Predict performance for many students (JSON array or CSV body)"""
+    import pandas as pd
+
+    try:
+        if 'file' in request.files:
+            df = pd.read_csv(request.files['file'])
+        elif request.mimetype == 'text/csv':
+            df = pd.read_csv(io.BytesIO(request.get_data()))
         else:
-            risk_level = 'High'
-            status = 'At-Risk Student'
-            recommendation = 'Immediate intervention recommended.'
-            color = 'danger'
-        
-        insights = []
-        if data['attendance'] < 75:
-            insights.append('Low attendance - recommend counseling')
-        if data['study_hours'] < 10:
-            insights.append('Insufficient study hours - suggest study plan')
-        if data['assignments_completed'] < 70:
-            insights.append('Low assignment completion - check engagement')
-        if data['previous_grades'] < 60:
-            insights.append('Struggling academically - consider tutoring')
+            data = request.get_json(silent=True)
+            if not isinstance(data, list):
+                return jsonify({
+                    'error': 'Expected a JSON array of students or a CSV body'
+                }), 400
+            df = pd.DataFrame(data)
+        
+        if df.empty:
+            return jsonify({'error': 'No students provided'}), 400
+        
+        missing_fields = [f for f in PREDICTION_FIELDS if f not in df.columns]
+        if missing_fields:
+            return jsonify({
+                'error': f'Missing fields: {", ".join(missing_fields)}'
+            }), 400
+        
+        if df[PREDICTION_FIELDS].isnull().any().any():
+            return jsonify({'error': 'Prediction fields must not be empty'}), 400
+        
+        predicted_scores = student_model.predict_many(df)
+        metrics.add_rows(len(df))
+        
+        # Tier labels, computed column-wise
+        tier_masks = [predicted_scores >= t[0] for t in PREDICTION_TIERS]
+        labels = [
+            np.select(tier_masks, [t[i] for t in PREDICTION_TIERS],
+                      default=PREDICTION_TIERS[-1][i])
+            for i in range(1, 5)
+        ]
+        
+        # One boolean column per insight rule
+        insight_masks = np.column_stack([
+            df[field].to_numpy(dtype=float) < threshold
+            for field, threshold, _ in INSIGHT_RULES
+        ])
+        insight_messages = [message for _, _, message in INSIGHT_RULES]
+        
+        student_ids = (df['student_id'].astype(str).tolist()
+                       if 'student_id' in df.columns else [None] * len(df))
+        rows = zip(
+            student_ids,
+            np.round(predicted_scores, 2).tolist(),
+            *(column.tolist() for column in labels),
+            insight_masks.tolist()
+        )
+        
+        def to_json(row):
+            student_id, score, risk_level, status, recommendation, color, flags = row
+            record = {} if student_id is None else {'student_id': student_id}
+            record.update({
+                'predicted_score': score,
+                'risk_level': risk_level,
+                'status': status,
+                'recommendation': recommendation,
+                'color': color,
+                'insights': [m for m, flag in zip(insight_messages, flags) if flag]
+            })
+            return json.dumps(record)
+        
+        def generate():
+            yield '{"total": %d, "predictions": [' % len(df)
+            for start in range(0, len(df), BATCH_STREAM_CHUNK):
+                chunk = itertools.islice(rows, BATCH_STREAM_CHUNK)
+                yield (',' if start else '') + ','.join(map(to_json, chunk))
+            yield ']}'
+        
+        return Response(generate(), mimetype='application/json')
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/predict/scenario', methods=['POST'])
+def predict_scenario():
+    """Re-score a cohort under feature changes ("what if attendance rose 10 points")
+
+    Body: {"changes": {feature: {operation: number}}, "limit": n}, with
+    operations set, multiply, add, floor and cap applied in that order.
+    The cohort is chosen with the /api/students filters in the query
+    string. Returns the shift in predicted risk distribution and up to
+    limit of the students whose risk level changes.
+    """
+    try:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Expected a JSON object with changes'}), 400
+        changes = parse_changes(data.get('changes'))
+        limit = data.get('limit', SCENARIO_LIST_SIZE)
+        if isinstance(limit, bool) or not isinstance(limit, int) or limit < 0:
+            return jsonify({'error': 'limit must be a non-negative integer'}), 400
+        
+        batches = iter_student_batches(_listing_filters(request.args), ['student_id'] + PREDICTION_FIELDS)
+        result = run_scenario(
+            student_model, feature_chunks(batches), changes,
+            [(t[0], t[1]) for t in PREDICTION_TIERS], min(limit, SCENARIO_MAX_LIST_SIZE)
+        )
+        metrics.add_rows(len(result['changed']))
         
         return jsonify({
-            'predicted_score': round(predicted_score, 2),
-            'risk_level': risk_level,
-            'status': status,
-            'recommendation': recommendation,
-            'color': color,
-            'insights': insights
+            'changes': changes,
+            'model_version': student_model.version,
+            **result
         }), 200
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _encode_cursor(key):
+    """Turn a (sort value, student_id) key into an opaque URL-safe cursor"""
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode()).decode()
+
+def _decode_cursor(cursor):
+    """Inverse of _encode_cursor"""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        raise ValueError('Invalid cursor')
+    if not isinstance(key, list) or len(key) != 2:
+        raise ValueError('Invalid cursor')
+    return tuple(key)
+
+def _listing_filters(args):
+    """Read /api/students filters from the query string"""
+    return {
+        'risk_level': args.get('risk_level'),
+        'major': args.get('major'),
+        'min_performance': args.get('min_performance', type=float),
+        'max_performance': args.get('max_performance', type=float),
+        'search': args.get('q')
+    }
+
 @app.route('/api/students', methods=['GET'])
 def get_students():
-    """Get all student data"""
+    """Get one page of students, or stream every match as NDJSON
+
+    Query parameters: risk_level, major, min_performance, max_performance,
+    q (search), sort, order (asc/desc), limit, cursor, format=ndjson.
+    """
     try:
-        students = get_all_students()
+        filters = _listing_filters(request.args)
+        sort = request.args.get('sort', 'student_id')
+        descending = request.args.get('order', 'asc').lower() == 'desc'
+        cursor = request.args.get('cursor')
+        after = _decode_cursor(cursor) if cursor else None
+        
+        if request.args.get('format') == 'ndjson':
+            rows = iter_students(filters, sort, descending, after)
+            
+            def generate():
+                for row in rows:
+                    metrics.add_rows(1)
+                    yield json.dumps(row) + '\n'
+            
+            return Response(
+                generate(),
+                mimetype='application/x-ndjson'
+            )
+        
+        limit = min(request.args.get('limit', STUDENTS_PAGE_SIZE, type=int), STUDENTS_MAX_PAGE_SIZE)
+        students, next_key = get_students_page(filters, sort, descending, after, max(limit, 1))
+        metrics.add_rows(len(students))
         return jsonify({
-            'total': len(students),
-            'students': students
+            'total': count_students(filters),
+            'students': students,
+            'next_cursor': _encode_cursor(next_key) if next_key else None
         }), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def dashboard_payload(summary):
+    """Dashboard response body built from the precomputed summary"""
+    total = int(summary['total_students'])
+    
+    if total == 0:
+        return {
+            'message': 'No data available',
+            'stats': {
+                'total_students': 0,
+                'average_performance': 0,
+                'at_risk_students': 0,
+                'high_performers': 0
+            }
+        }
+    
+    def average(column):
+        count = summary[f'{column}_count']
+        return round(summary[f'{column}_sum'] / count, 2) if count else 0
+    
+    stats = {
+        'total_students': total,
+        'average_performance': average('performance'),
+        'at_risk_students': int(summary['perf_below_50']),
+        'high_performers': int(summary['high_performers']),
+        'average_attendance': average('attendance'),
+        'average_study_hours': average('study_hours')
+    }
+    
+    performance_dist = {
+        'Below 50': int(summary['perf_below_50']),
+        '50-60': int(summary['perf_50_60']),
+        '60-70': int(summary['perf_60_70']),
+        '70-80': int(summary['perf_70_80']),
+        'Above 80': int(summary['perf_above_80'])
+    }
+    
+    risk_dist = {
+        'Low': int(summary['risk_low']),
+        'Medium': int(summary['risk_medium']),
+        'High': int(summary['risk_high'])
+    }
+    
+    return {
+        'stats': stats,
+        'performance_distribution': performance_dist,
+        'risk_distribution': risk_dist
+    }
+
 @app.route('/api/dashboard', methods=['GET'])
 def get_dashboard():
     """Get dashboard statistics"""
     try:
-        df = get_student_dataframe()
-        
-        if df.empty:
-            return jsonify({
-                'message': 'No data available',
-                'stats': {
-                    'total_students': 0,
-                    'average_performance': 0,
-                    'at_risk_students': 0,
-                    'high_performers': 0
-                }
-            }), 200
-        
-        stats = {
-            'total_students': len(df),
-            'average_performance': round(df['performance'].mean(), 2),
-            'at_risk_students': len(df[df['performance'] < 50]),
-            'high_performers': len(df[df['performance'] >= 75]),
-            'average_attendance': round(df['attendance'].mean(), 2),
-            'average_study_hours': round(df['study_hours'].mean(), 2)
-        }
-        
-        performance_dist = {
-            'Below 50': len(df[df['performance'] < 50]),
-            '50-60': len(df[(df['performance'] >= 50) & (df['performance'] < 60)]),
-            '60-70': len(df[(df['performance'] >= 60) & (df['performance'] < 70)]),
-            '70-80': len(df[(df['performance'] >= 70) & (df['performance'] < 80)]),
-            'Above 80': len(df[df['performance'] >= 80])
-        }
-        
-        risk_dist = {
-            'Low': len(df[df['risk_level'] == 'Low']),
-            'Medium': len(df[df['risk_level'] == 'Medium']),
-            'High': len(df[df['risk_level'] == 'High'])
-        }
-        
-        return jsonify({
-            'stats': stats,
-            'performance_distribution': performance_dist,
-            'risk_distribution': risk_dist
-        }), 200
-        
+        return jsonify(dashboard_payload(get_dashboard_summary())), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@functools.lru_cache(maxsize=32)
+def _scatter_series(mode, size, data_version):
+    """Chart points for every scatter series; data_version keys the cache"""
+    if mode == 'binned':
+        series, edges = {}, {}
+        for name, (x, y) in SCATTER_SERIES.items():
+            x_edges, y_edges, counts = get_binned_counts(x, y, size)
+            series[name] = binned_points(x_edges, y_edges, counts)
+            edges[name] = {'x_edges': x_edges.tolist(), 'y_edges': y_edges.tolist()}
+        return series, edges
+
+    columns = list(dict.fromkeys(col for pair in SCATTER_SERIES.values() for col in pair))
+    sample = (get_stable_sample if mode == 'sample' else get_random_sample)(columns, size)
+    return {name: scatter_points(sample[x], sample[y])
+            for name, (x, y) in SCATTER_SERIES.items()}, None
+
 @app.route('/api/analytics', methods=['GET'])
 def get_analytics():
-    """Get analytics data for charts"""
+    """Get analytics data for charts
+
+    Query parameters: scatter (binned, sample or random), bins (cells per
+    axis when binned) and sample_size (points when sampling).
+    """
     try:
-        df = get_student_dataframe()
-        
-        if df.empty:
+        if get_dashboard_summary()['total_students'] == 0:
             return jsonify({
                 'message': 'No data available',
                 'analytics': {}
             }), 200
         
-        # Sample for scatter plots if too large
-        plot_df = df.sample(min(len(df), 500)) if len(df) > 500 else df
+        mode = request.args.get('scatter', 'binned')
+        if mode not in SCATTER_MODES:
+            return jsonify({'error': f'scatter must be one of: {", ".join(SCATTER_MODES)}'}), 400
+        if mode == 'binned':
+            size = min(max(request.args.get('bins', SCATTER_BINS, type=int), 1), SCATTER_MAX_BINS)
+        else:
+            size = min(max(request.args.get('sample_size', SCATTER_SAMPLE_SIZE, type=int), 1),
+                       SCATTER_MAX_SAMPLE_SIZE)
+        
+        if mode == 'random':
+            series, edges = _scatter_series.__wrapped__(mode, size, None)
+        else:
+            # Cached until an upload or clear bumps the data version
+            series, edges = _scatter_series(mode, size, get_data_version())
+        participation = get_category_counts('participation')
 
         analytics = {
-            'attendance_vs_performance': [
-                {'x': row['attendance'], 'y': row['performance']}
-                for _, row in plot_df.iterrows()
-            ],
-            'study_hours_vs_performance': [
-                {'x': row['study_hours'], 'y': row['performance']}
-                for _, row in plot_df.iterrows()
-            ],
-            'grades_vs_assignments': [
-                {'x': row['previous_grades'], 'y': row['assignments_completed']}
-                for _, row in plot_df.iterrows()
-            ],
+            **series,
+            'scatter': {'mode': mode, 'size': size},
             'participation_distribution': {
-                'Low': len(df[df['participation'] == 1]),
-                'Medium': len(df[df['participation'] == 2]),
-                'High': len(df[df['participation'] == 3])
+                'Low': participation.get(1, 0),
+                'Medium': participation.get(2, 0),
+                'High': participation.get(3, 0)
             },
-           'major_distribution': df['major'].value_counts().to_dict(),
+           'major_distribution': get_category_counts('major'),
            'feature_importance': student_model.get_feature_importance()
         }
+        if edges:
+            analytics['scatter']['edges'] = edges
         
         return jsonify(analytics), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/analytics/segments', methods=['GET'])
+def get_segment_analytics():
+    """Performance mean, percentiles and risk counts per demographic segment
+
+    Query parameters: by (comma-separated dimensions to group on, default
+    major; empty for one overall segment) and any dimension as a filter,
+    e.g. ?by=gender,year_of_study&major=Engineering.
+    """
+    try:
+        by = request.args.get('by', 'major')
+        dimensions = list(dict.fromkeys(d.strip() for d in by.split(',') if d.strip()))
+        filters = {dim: request.args[dim] for dim in SEGMENT_DIMENSIONS if dim in request.args}
+        segments = get_segments(dimensions, filters)
+        
+        return jsonify({
+            'dimensions': dimensions,
+            'filters': filters,
+            'total_students': sum(segment['students'] for segment in segments),
+            'segments': segments
+        }), 200
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/export', methods=['GET'])
 def export_data():
-    """Export student data as CSV"""
+    """Export student data as a streamed CSV
+
+    Query parameters: columns (comma-separated subset) and gzip=1, which
+    gzip-encodes the stream when the client accepts it.
+    """
     try:
-        students = get_all_students()
-        if not students:
+        if get_dashboard_summary()['total_students'] == 0:
             return jsonify({'error': 'No data to export'}), 400
-
-        # Create CSV in memory
-        si = io.StringIO()
-        cw = csv.DictWriter(si, fieldnames=students[0].keys())
-        cw.writeheader()
-        cw.writerows(students)
-        output = si.getvalue()
-
+        
+        columns = request.args.get('columns')
+        columns = [c.strip() for c in columns.split(',') if c.strip()] if columns else STUDENT_COLUMNS
+        unknown = [c for c in columns if c not in STUDENT_COLUMNS]
+        if unknown:
+            return jsonify({'error': f'Unknown columns: {", ".join(unknown)}'}), 400
+        
+        use_gzip = (request.args.get('gzip') == '1' and
+                    'gzip' in request.headers.get('Accept-Encoding', ''))
+        
+        def generate_csv():
+            # One small buffer reused per fetchmany batch
+            si = io.StringIO()
+            cw = csv.writer(si)
+            cw.writerow(columns)
+            for rows in iter_student_batches({}, columns):
+                metrics.add_rows(len(rows))
+                cw.writerows(rows)
+                yield si.getvalue()
+                si.seek(0)
+                si.truncate()
+            if si.tell():
+                yield si.getvalue()
+        
+        def generate_gzip():
+            compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: gzip framing
+            for chunk in generate_csv():
+                data = compressor.compress(chunk.encode())
+                if data:
+                    yield data
+            yield compressor.flush()
+        
+        headers = {"Content-disposition": "attachment; filename=student_analytics_export.csv"}
+        if use_gzip:
+            headers['Content-Encoding'] = 'gzip'
+        
         return Response(
-            output,
+            generate_gzip() if use_gzip else generate_csv(),
             mimetype="text/csv",
-            headers={"Content-disposition": "attachment; filename=student_analytics_export.csv"}
+            headers=headers
         )
     except Exception as e:
         return jsonify({'error': str(e)}), 500
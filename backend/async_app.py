@@ -0,0 +1,352 @@
+import asyncio
+import io
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from app import (
+    app as flask_app, student_model, warm_up, missing_prediction_fields,
+    prediction_payload, dashboard_payload
+)
+from database import (
+    DB_NAME, SELECT_SUMMARY, SELECT_TRAINING_JOB, TRAINING_JOB_COLUMNS,
+    get_connection, summary_from_rows
+)
+
+# Threads scoring /api/predict requests; NumPy releases the GIL in the
+# forest traversal, so these run in parallel with the event loop
+PREDICT_THREADS = int(os.environ.get('ASGI_PREDICT_THREADS', os.cpu_count() or 4))
+# Threads running the Flask app for every route not served natively here.
+# Kept separate so slow uploads, analytics and exports cannot occupy the
+# threads predictions need
+WSGI_THREADS = int(os.environ.get('ASGI_WSGI_THREADS', 8))
+# Threads for database reads when aiosqlite is not installed
+IO_THREADS = int(os.environ.get('ASGI_IO_THREADS', 4))
+# Response chunks buffered per streamed Flask response before the
+# producing thread waits for the client
+STREAM_QUEUE_SIZE = 8
+# Request body messages buffered for a Flask route before the server stops
+# reading from the client, so uploads are never held in memory whole
+BODY_QUEUE_SIZE = 8
+
+class AsyncDatabase:
+    """Non-blocking reads for the routes served natively
+
+    Uses one aiosqlite connection (optional dependency) when installed;
+    otherwise runs the query on a small thread pool, each thread with its
+    own connection from database.get_connection().
+    """
+
+    def __init__(self):
+        self.conn = None
+        self.pool = None
+
+    async def open(self):
+        try:
+            import aiosqlite
+        except ImportError:
+            self.pool = ThreadPoolExecutor(IO_THREADS, thread_name_prefix='asgi-io')
+            return
+        self.conn = await aiosqlite.connect(DB_NAME)
+        await self.conn.execute("PRAGMA cache_size = -64000")
+
+    async def close(self):
+        if self.conn is not None:
+            await self.conn.close()
+        if self.pool is not None:
+            self.pool.shutdown(wait=False)
+
+    async def fetchall(self, sql, params=()):
+        if self.conn is not None:
+            async with self.conn.execute(sql, params) as cursor:
+                return await cursor.fetchall()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.pool, lambda: get_connection().execute(sql, params).fetchall()
+        )
+
+class AsyncApp:
+    """ASGI application serving the Flask routes without blocking the loop
+
+    /api/status, /api/predict, /api/dashboard and /api/train/status are
+    handled natively: database reads go through AsyncDatabase and
+    inference runs on a bounded predict pool. Every other route is passed
+    to the Flask app on a bounded WSGI pool, each request on one thread
+    from start to end (the sqlite connection and metrics are per thread)
+    with its request and response bodies streamed through bounded queues.
+    """
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+        self.db = AsyncDatabase()
+        self.predict_pool = None
+        self.wsgi_pool = None
+        self.started = False
+        # Held by the first requests when the server skips the lifespan
+        # protocol, so only one of them starts the pools
+        self.startup_lock = asyncio.Lock()
+
+    async def startup(self):
+        self.predict_pool = ThreadPoolExecutor(PREDICT_THREADS, thread_name_prefix='asgi-predict')
+        self.wsgi_pool = ThreadPoolExecutor(WSGI_THREADS, thread_name_prefix='asgi-wsgi')
+        # Schema and model before the first request, off the event loop
+        await asyncio.get_running_loop().run_in_executor(self.wsgi_pool, warm_up)
+        await self.db.open()
+        self.started = True
+
+    async def shutdown(self):
+        await self.db.close()
+        self.predict_pool.shutdown(wait=False)
+        self.wsgi_pool.shutdown(wait=True)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+        if scope['type'] != 'http':
+            return
+        if not self.started:
+            # Servers that skip the lifespan protocol
+            async with self.startup_lock:
+                if not self.started:
+                    await self.startup()
+
+        path, method = scope['path'], scope['method']
+        if path == '/api/status' and method == 'GET':
+            return await self._timed('status', method, send, self.status())
+        if path == '/api/predict' and method == 'POST':
+            return await self._timed('predict', method, send, self.predict(receive))
+        if path == '/api/dashboard' and method == 'GET':
+            return await self._timed('get_dashboard', method, send, self.dashboard())
+        if path.startswith('/api/train/status/') and method == 'GET':
+            job_id = path[len('/api/train/status/'):]
+            return await self._timed('training_status', method, send, self.training_status(job_id))
+        await self._call_wsgi(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await self.startup()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    # --- Native routes ---
+
+    async def _timed(self, endpoint, method, send, handler):
+        """Run a native handler, send its JSON response and record metrics"""
+        timings = metrics.RequestTimings()
+        try:
+            status, payload = await handler
+        except Exception as e:
+            status, payload = 500, {'error': str(e)}
+        body = json.dumps(payload).encode()
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(b'content-type', b'application/json'),
+                        (b'content-length', str(len(body)).encode())]
+        })
+        await send({'type': 'http.response.body', 'body': body})
+        metrics.end_request(timings, endpoint, method, status, len(body))
+
+    async def status(self):
+        return 200, {
+            'message': 'Student Success Prediction API',
+            'version': '2.0',
+            'status': 'running'
+        }
+
+    async def predict(self, receive):
+        try:
+            data = json.loads(await _read_body(receive) or b'null')
+        except ValueError:
+            return 400, {'error': 'Request body must be JSON'}
+        if not isinstance(data, dict):
+            return 400, {'error': 'Request body must be a JSON object'}
+        missing_fields = missing_prediction_fields(data)
+        if missing_fields:
+            return 400, {'error': f'Missing fields: {", ".join(missing_fields)}'}
+
+        loop = asyncio.get_running_loop()
+        predicted_score = await loop.run_in_executor(self.predict_pool, student_model.predict, data)
+        return 200, prediction_payload(data, predicted_score)
+
+    async def dashboard(self):
+        rows = await self.db.fetchall(SELECT_SUMMARY)
+        return 200, dashboard_payload(summary_from_rows(rows))
+
+    async def training_status(self, job_id):
+        rows = await self.db.fetchall(SELECT_TRAINING_JOB, (job_id,))
+        if not rows:
+            return 404, {'error': 'Unknown training job'}
+        return 200, dict(zip(TRAINING_JOB_COLUMNS, rows[0]))
+
+    # --- Everything else: the Flask app on the WSGI pool ---
+
+    async def _call_wsgi(self, scope, receive, send):
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(STREAM_QUEUE_SIZE)
+        body = asyncio.Queue(BODY_QUEUE_SIZE)
+        disconnected = threading.Event()
+        environ = _wsgi_environ(scope, _BodyReader(body, loop))
+
+        async def pump_receive():
+            """Feed body chunks to the app's wsgi.input, then watch for disconnect"""
+            more_body = True
+            while True:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    disconnected.set()
+                    if more_body:
+                        await body.put(b'')
+                    return
+                if more_body:
+                    more_body = message.get('more_body', False)
+                    chunk = message.get('body', b'')
+                    if chunk:
+                        await body.put(chunk)
+                    if not more_body:
+                        await body.put(b'')
+
+        def put(message):
+            asyncio.run_coroutine_threadsafe(queue.put(message), loop).result()
+
+        def run():
+            """Run the request on one thread, handing messages to the loop"""
+            response = {}
+
+            def start_response(status, headers, exc_info=None):
+                response['status'] = int(status.split(' ', 1)[0])
+                response['headers'] = [
+                    (name.lower().encode('latin-1'), value.encode('latin-1'))
+                    for name, value in headers
+                ]
+
+            try:
+                result = self.wsgi_app(environ, start_response)
+                try:
+                    started = False
+                    for chunk in result:
+                        if not started:
+                            put(('start', response))
+                            started = True
+                        if chunk:
+                            put(('body', chunk))
+                        if disconnected.is_set():
+                            break
+                    if not started:
+                        put(('start', response))
+                finally:
+                    if hasattr(result, 'close'):
+                        result.close()
+                put(('end', None))
+            except BaseException as e:
+                put(('error', e))
+
+        future = loop.run_in_executor(self.wsgi_pool, run)
+        watcher = asyncio.ensure_future(pump_receive())
+        try:
+            while True:
+                kind, value = await queue.get()
+                if kind == 'start':
+                    await send({'type': 'http.response.start', 'status': value['status'],
+                                'headers': value['headers']})
+                elif kind == 'body':
+                    await send({'type': 'http.response.body', 'body': value, 'more_body': True})
+                elif kind == 'end':
+                    await send({'type': 'http.response.body', 'body': b''})
+                    break
+                else:
+                    raise value
+        except BaseException:
+            # Client gone (or the app failed): let the thread stop at the next chunk
+            disconnected.set()
+            while not future.done():
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    await asyncio.sleep(0.01)
+            raise
+        finally:
+            watcher.cancel()
+        await future
+
+async def _read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            break
+    return b''.join(chunks)
+
+class _BodyReader(io.RawIOBase):
+    """wsgi.input reading the ASGI request body as the app consumes it
+
+    Runs on the WSGI thread and takes chunks from the bounded queue that
+    _call_wsgi fills from receive(); an empty chunk marks the end.
+    """
+
+    def __init__(self, queue, loop):
+        self.queue = queue
+        self.loop = loop
+        self.pending = b''
+        self.finished = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self.pending and not self.finished:
+            chunk = asyncio.run_coroutine_threadsafe(self.queue.get(), self.loop).result()
+            self.pending = memoryview(chunk)
+            self.finished = not chunk
+        size = min(len(buffer), len(self.pending))
+        buffer[:size] = self.pending[:size]
+        self.pending = self.pending[size:]
+        return size
+
+def _wsgi_environ(scope, body):
+    """PEP 3333 environ for an ASGI HTTP scope, reading the body from a _BodyReader"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': str(server[0]),
+        'SERVER_PORT': str(server[1] or 80),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BufferedReader(body),
+        # The reader ends with the body, so it may be read without a length
+        'wsgi.input_terminated': True,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif name == 'CONTENT_LENGTH':
+            environ['CONTENT_LENGTH'] = value
+        else:
+            key = f'HTTP_{name}'
+            environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+app = AsyncApp(flask_app)
@@ -0,0 +1,125 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Entries kept per worker (0 disables caching)
+PREDICTION_CACHE_SIZE = int(os.environ.get('PREDICTION_CACHE_SIZE', 10000))
+# Seconds an entry stays valid (0: until evicted or the model changes)
+PREDICTION_CACHE_TTL = float(os.environ.get('PREDICTION_CACHE_TTL', 300))
+# Optional redis:// URL of a cache shared by all gunicorn workers
+PREDICTION_CACHE_URL = os.environ.get('PREDICTION_CACHE_URL')
+
+class PredictionCache:
+    """Thread-safe in-process LRU cache with an optional TTL
+
+    Keys are (model version, feature tuple), so publishing a new model
+    makes older entries unreachable; clear() drops them eagerly.
+    """
+
+    def __init__(self, maxsize=PREDICTION_CACHE_SIZE, ttl=PREDICTION_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Return the cached value for key, or None"""
+        if self.maxsize <= 0:
+            return None
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or (entry[1] and entry[1] < time.monotonic()):
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        """Store value under key, evicting the least recently used entry"""
+        if self.maxsize <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl > 0 else 0
+        with self.lock:
+            self.entries[key] = (value, expires_at)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every entry (counters are kept)"""
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        """Hit/miss counters and occupancy, for sizing the cache"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': 'local',
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0,
+                'evictions': self.evictions,
+                'size': len(self.entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl
+            }
+
+class RedisPredictionCache:
+    """Prediction cache shared by all workers through Redis
+
+    Requires the optional `redis` package. Entries expire after the TTL;
+    eviction beyond that is left to the Redis maxmemory policy. Hit/miss
+    counters are kept in Redis so stats() reports all workers together.
+    """
+
+    PREFIX = 'student-analytics:predict:'
+
+    def __init__(self, url, ttl=PREDICTION_CACHE_TTL):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+
+    def _key(self, key):
+        return self.PREFIX + json.dumps(key)
+
+    def get(self, key):
+        value = self.client.get(self._key(key))
+        self.client.incr(self.PREFIX + ('hits' if value is not None else 'misses'))
+        return None if value is None else float(value)
+
+    def put(self, key, value):
+        ttl = int(self.ttl) if self.ttl > 0 else None
+        self.client.set(self._key(key), repr(float(value)), ex=ttl)
+
+    def clear(self):
+        # Entries are keyed by model version, so stale ones are never read again
+        pass
+
+    def stats(self):
+        hits = int(self.client.get(self.PREFIX + 'hits') or 0)
+        misses = int(self.client.get(self.PREFIX + 'misses') or 0)
+        lookups = hits + misses
+        return {
+            'backend': 'redis',
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / lookups, 4) if lookups else 0,
+            'ttl': self.ttl
+        }
+
+def make_prediction_cache():
+    """Build the cache configured by the PREDICTION_CACHE_* variables"""
+    if PREDICTION_CACHE_URL:
+        return RedisPredictionCache(PREDICTION_CACHE_URL)
+    return PredictionCache()
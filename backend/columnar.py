@@ -0,0 +1,249 @@
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from urllib.parse import quote, unquote
+
+import numpy as np
+import pandas as pd
+
+from features import bin_edges, bottom_k, histogram2d, sample_keys
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ARROW_STORE_DIR = os.environ.get('STUDENT_ARROW_DIR', os.path.join(BASE_DIR, 'arrow_store'))
+
+# Students are split into one Arrow IPC file per value of this column
+PARTITION_COLUMN = 'major'
+# File name stem of the partition holding students without a major
+NULL_PARTITION = '__null__'
+# Present only while the files match the committed SQLite table
+SYNCED_MARKER = 'SYNCED'
+# flock held while partitions are rewritten, across worker processes
+SYNC_LOCK_FILE = '.sync.lock'
+
+# Stands in for the flock where fcntl is unavailable (one process only)
+_local_sync_lock = threading.Lock()
+
+# Arrow types of the student columns, in STUDENT_COLUMNS order
+COLUMN_TYPES = {
+    'student_id': 'string',
+    'attendance': 'float64',
+    'study_hours': 'float64',
+    'previous_grades': 'float64',
+    'assignments_completed': 'float64',
+    'participation': 'float64',
+    'performance': 'float64',
+    'risk_level': 'string',
+    'major': 'string',
+    'year_of_study': 'string',
+    'gender': 'string',
+    'ethnicity': 'string',
+    'parent_education': 'string',
+    'family_income': 'string'
+}
+
+class ArrowStudentStore:
+    """Columnar replica of the students table in memory-mapped Arrow IPC files
+
+    SQLite stays the system of record (upserts, keyset listing, training
+    jobs); after each upload the partitions it touched are rewritten whole
+    from the committed rows. Partitions are per major, so an upload
+    spanning every major rewrites nearly the whole store. Reads open the files with memory mapping, project
+    only the requested columns and never copy data they do not return, so
+    analytics touch a few columns instead of whole rows. Requires the
+    optional `pyarrow` package.
+    """
+
+    def __init__(self, root=ARROW_STORE_DIR):
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.ipc as ipc
+
+        self.pa, self.pc, self.ipc = pa, pc, ipc
+        self.root = root
+        self.schema = pa.schema([(col, getattr(pa, t)()) for col, t in COLUMN_TYPES.items()])
+        # path -> ((inode, mtime_ns, size), table) of partitions already mapped
+        self._mapped = {}
+        os.makedirs(root, exist_ok=True)
+
+    # --- Writes ---
+
+    def _path(self, value):
+        stem = NULL_PARTITION if value is None else quote(str(value), safe='')
+        return os.path.join(self.root, f'{PARTITION_COLUMN}={stem}.arrow')
+
+    def is_synced(self):
+        return os.path.exists(os.path.join(self.root, SYNCED_MARKER))
+
+    def mark_synced(self):
+        open(os.path.join(self.root, SYNCED_MARKER), 'w').close()
+
+    def mark_unsynced(self):
+        """Record that SQLite has changes the files do not reflect yet"""
+        marker = os.path.join(self.root, SYNCED_MARKER)
+        if os.path.exists(marker):
+            os.remove(marker)
+
+    @contextmanager
+    def sync_lock(self):
+        """Hold an exclusive lock on the store while partitions are rewritten
+
+        An flock on SYNC_LOCK_FILE, so syncs in different worker processes
+        run one after another and a file written from an older snapshot
+        never replaces a newer one. Not reentrant.
+        """
+        try:
+            import fcntl
+        except ImportError:
+            with _local_sync_lock:
+                yield
+            return
+        with open(os.path.join(self.root, SYNC_LOCK_FILE), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _write_partition(self, conn, value):
+        """Rewrite one partition file from the rows currently in SQLite"""
+        df = pd.read_sql_query(
+            f"SELECT {', '.join(COLUMN_TYPES)} FROM students WHERE {PARTITION_COLUMN} IS ?",
+            conn, params=(value,)
+        )
+        path = self._path(value)
+        if df.empty:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        table = self.pa.Table.from_pandas(df, schema=self.schema, preserve_index=False)
+        tmp_path = f'{path}.{uuid.uuid4().hex[:8]}.tmp'
+        with self.ipc.new_file(tmp_path, self.schema) as writer:
+            writer.write_table(table)
+        # Readers holding the old file keep their mapping of its inode
+        os.replace(tmp_path, path)
+
+    def sync_partitions(self, conn, values):
+        """Rewrite the partitions for the given partition values
+
+        Call inside one read transaction, holding sync_lock(), so every
+        file comes from the same snapshot. Leaves the SYNCED marker to the
+        caller (see database.sync_columnar_store).
+        """
+        for value in values:
+            self._write_partition(conn, value)
+
+    def rebuild(self, conn):
+        """Rewrite every partition from SQLite and drop stale ones"""
+        values = [row[0] for row in conn.execute(
+            f"SELECT DISTINCT {PARTITION_COLUMN} FROM students"
+        )]
+        keep = {self._path(value) for value in values}
+        for path in self._partition_files():
+            if path not in keep:
+                os.remove(path)
+        self.sync_partitions(conn, values)
+
+    def clear(self):
+        """Delete every partition (the table is empty and in sync)"""
+        with self.sync_lock():
+            for path in self._partition_files():
+                os.remove(path)
+            self._mapped.clear()
+            self.mark_synced()
+
+    # --- Reads ---
+
+    def _partition_files(self):
+        return sorted(
+            os.path.join(self.root, name) for name in os.listdir(self.root)
+            if name.startswith(f'{PARTITION_COLUMN}=') and name.endswith('.arrow')
+        )
+
+    def _partitions(self):
+        """{path: table} of every partition, memory-mapped and cached per file"""
+        tables = {}
+        for path in self._partition_files():
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            stat_key = (st.st_ino, st.st_mtime_ns, st.st_size)
+            cached = self._mapped.get(path)
+            if cached is None or cached[0] != stat_key:
+                source = self.pa.memory_map(path)
+                cached = (stat_key, self.ipc.open_file(source).read_all())
+                self._mapped[path] = cached
+            tables[path] = cached[1]
+        for path in set(self._mapped) - set(tables):
+            del self._mapped[path]
+        return tables
+
+    def _table(self, columns):
+        """All partitions projected onto columns, as one zero-copy table"""
+        tables = [table.select(columns) for table in self._partitions().values()]
+        if not tables:
+            return self.schema.empty_table().select(columns)
+        return self.pa.concat_tables(tables)
+
+    def dataframe(self, columns=None):
+        """Students as a DataFrame holding only the requested columns"""
+        return self._table(list(columns or COLUMN_TYPES)).to_pandas()
+
+    def batches(self, columns, size):
+        """Rows in record batches of at most size as {column: NumPy array}
+
+        Numbers come back as float64 (NaN missing), text as object arrays
+        (None missing); only one batch is converted at a time.
+        """
+        columns = list(columns)
+        for batch in self._table(columns).to_batches(max_chunksize=size):
+            yield {
+                col: batch.column(i).to_numpy(zero_copy_only=False)
+                for i, col in enumerate(columns)
+            }
+
+    def category_counts(self, column):
+        """Students per non-null value of column, most common first"""
+        if column == PARTITION_COLUMN:
+            # Partition sizes straight from the file footers
+            counts = {
+                unquote(os.path.basename(path)[len(PARTITION_COLUMN) + 1:-len('.arrow')]):
+                    table.num_rows
+                for path, table in self._partitions().items()
+            }
+            counts.pop(NULL_PARTITION, None)
+        else:
+            values = self.pc.value_counts(self._table([column]).column(column))
+            # Integral floats (participation levels) keyed as ints, like SQLite
+            counts = {
+                int(value) if isinstance(value, float) and value.is_integer() else value: count
+                for value, count in zip(values.field('values').to_pylist(),
+                                        values.field('counts').to_pylist())
+                if value is not None
+            }
+        return dict(sorted(counts.items(), key=lambda item: item[1], reverse=True))
+
+    def random_sample(self, columns, limit):
+        """Up to limit random rows of columns, as {column: list of values}"""
+        table = self._table(columns)
+        size = min(limit, table.num_rows)
+        indices = np.sort(np.random.default_rng().choice(table.num_rows, size, replace=False))
+        return table.take(indices).to_pydict()
+
+    def binned_counts(self, x, y, bins):
+        """2D histogram of two columns; same contract as database.get_binned_counts"""
+        table = self._table([x, y]).drop_null()
+        xs = table.column(x).to_numpy()
+        ys = table.column(y).to_numpy()
+        if not len(xs):
+            return bin_edges(0, 1, bins), bin_edges(0, 1, bins), np.zeros((bins, bins), dtype=np.int64)
+        x_edges = bin_edges(xs.min(), xs.max(), bins)
+        y_edges = bin_edges(ys.min(), ys.max(), bins)
+        return x_edges, y_edges, histogram2d(xs, ys, x_edges, y_edges)
+
+    def stable_sample(self, columns, limit):
+        """Deterministic sample; same contract as database.get_stable_sample"""
+        table = self._table(['student_id'] + columns).drop_null()
+        keep = bottom_k(sample_keys(table.column('student_id').to_numpy(zero_copy_only=False)), limit)
+        return table.select(columns).take(keep).to_pydict()
@@ -1,16 +1,39 @@
 import sqlite3
-import pandas as pd
+import threading
+import numpy as np
 import os
+from contextlib import contextmanager
+
+from metrics import timed, timer
+from features import bin_edges, bottom_k, sample_keys
+import segments
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DB_NAME = os.path.join(BASE_DIR, "students.db")
+DB_NAME = os.environ.get('STUDENT_DB_PATH', os.path.join(BASE_DIR, "students.db"))
+# Where analytics reads are served from: 'sqlite', 'arrow' for the
+# memory-mapped columnar replica in columnar.py (requires pyarrow), or
+# 'snapshot' for the compact per-worker in-memory copy in snapshot.py
+STUDENT_STORE = os.environ.get('STUDENT_STORE', 'sqlite')
+# Bytes of the database file SQLite may memory-map for reads
+SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+# Compiled statements kept per connection (sqlite3's own statement cache)
+STATEMENT_CACHE_SIZE = 256
 
-def init_db():
-    """Initialize the database with the students table"""
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS students (
+STUDENT_COLUMNS = [
+    'student_id', 'attendance', 'study_hours', 'previous_grades',
+    'assignments_completed', 'participation', 'performance', 'risk_level',
+    'major', 'year_of_study', 'gender', 'ethnicity', 'parent_education',
+    'family_income'
+]
+
+# Rows sent to executemany per batch during an upsert
+UPSERT_CHUNK_SIZE = 10000
+
+# Keep IN (...) lookups under SQLite's bound-parameter limit
+LOOKUP_CHUNK_SIZE = 900
+
+CREATE_STUDENTS_TABLE = '''
+        CREATE TABLE IF NOT EXISTS {table} (
             student_id TEXT PRIMARY KEY,
             attendance REAL,
             study_hours REAL,
@@ -26,52 +49,695 @@ def init_db():
             parent_education TEXT,
             family_income TEXT
         )
-    ''')
+    '''
+
+CREATE_TRAINING_JOBS_TABLE = '''
+        CREATE TABLE IF NOT EXISTS training_jobs (
+            job_id TEXT PRIMARY KEY,
+            status TEXT,
+            stage TEXT,
+            result TEXT,
+            error TEXT,
+            submitted_at REAL,
+            started_at REAL,
+            finished_at REAL
+        )
+    '''
+
+TRAINING_JOB_COLUMNS = [
+    'job_id', 'status', 'stage', 'result', 'error',
+    'submitted_at', 'started_at', 'finished_at'
+]
+
+CREATE_SUMMARY_TABLE = '''
+        CREATE TABLE IF NOT EXISTS student_summary (
+            metric TEXT PRIMARY KEY,
+            value REAL
+        )
+    '''
+
+# Single-row counter bumped by every change to the students table, so
+# derived results can be cached until the data changes
+CREATE_DATA_VERSION_TABLE = '''
+        CREATE TABLE IF NOT EXISTS data_version (
+            id INTEGER PRIMARY KEY CHECK (id = 0),
+            version INTEGER NOT NULL
+        )
+    '''
+
+# Running aggregates behind the dashboard, as SQL over a set of student rows.
+# Every expression is additive, so the summary is maintained by adding the
+# aggregate of upserted rows and subtracting the aggregate of the rows they replace.
+SUMMARY_AGGREGATES = {
+    'total_students': "COUNT(*)",
+    'performance_sum': "TOTAL(performance)",
+    'performance_count': "COUNT(performance)",
+    'attendance_sum': "TOTAL(attendance)",
+    'attendance_count': "COUNT(attendance)",
+    'study_hours_sum': "TOTAL(study_hours)",
+    'study_hours_count': "COUNT(study_hours)",
+    'high_performers': "TOTAL(performance >= 75)",
+    'perf_below_50': "TOTAL(performance < 50)",
+    'perf_50_60': "TOTAL(performance >= 50 AND performance < 60)",
+    'perf_60_70': "TOTAL(performance >= 60 AND performance < 70)",
+    'perf_70_80': "TOTAL(performance >= 70 AND performance < 80)",
+    'perf_above_80': "TOTAL(performance >= 80)",
+    'risk_low': "TOTAL(risk_level = 'Low')",
+    'risk_medium': "TOTAL(risk_level = 'Medium')",
+    'risk_high': "TOTAL(risk_level = 'High')"
+}
+
+# Columns that may be grouped on or sampled by the analytics queries
+CATEGORY_COLUMNS = [
+    'participation', 'risk_level', 'major', 'year_of_study', 'gender',
+    'ethnicity', 'parent_education', 'family_income'
+]
+NUMERIC_COLUMNS = [
+    'attendance', 'study_hours', 'previous_grades',
+    'assignments_completed', 'participation', 'performance'
+]
+
+STUDENT_INDEXES = {
+    'idx_students_performance': 'performance',
+    'idx_students_risk_level': 'risk_level',
+    'idx_students_participation': 'participation',
+    'idx_students_major': 'major'
+}
+
+# Columns /api/students may sort on; student_id breaks ties for keyset paging
+SORT_COLUMNS = ['student_id'] + [col for col in NUMERIC_COLUMNS if col != 'participation']
+
+# Rows pulled from the cursor per fetchmany when streaming
+STREAM_FETCH_SIZE = 1000
+
+SUMMARY_SELECT = "SELECT " + ", ".join(SUMMARY_AGGREGATES.values()) + " FROM students"
+
+# Reads shared with the async server (async_app.py)
+SELECT_SUMMARY = "SELECT metric, value FROM student_summary"
+SELECT_TRAINING_JOB = (
+    f"SELECT {', '.join(TRAINING_JOB_COLUMNS)} FROM training_jobs WHERE job_id = ?"
+)
+
+# One connection per thread, opened on first use and kept for the thread's life
+_local = threading.local()
+# Database files whose schema init_db() has created or migrated in this process
+_schema_ready = set()
+_schema_lock = threading.Lock()
+
+def _open_connection():
+    """Open a connection with the per-connection pragmas applied
+
+    isolation_level=None leaves transactions to transaction(), so a read
+    never holds a transaction open between requests.
+    """
+    conn = sqlite3.connect(
+        DB_NAME, isolation_level=None, cached_statements=STATEMENT_CACHE_SIZE
+    )
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    conn.execute("PRAGMA cache_size = -64000")
+    conn.execute(f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE}")
+    conn.execute("PRAGMA busy_timeout = 5000")
+    return conn
+
+def get_connection():
+    """This thread's connection, reused across requests
+
+    Reopened after a fork (connections must not cross processes) and when
+    DB_NAME has been pointed elsewhere. Reusing the connection keeps its
+    page cache, memory map and compiled statements warm.
+    """
+    key = (os.getpid(), DB_NAME)
+    if getattr(_local, 'key', None) != key:
+        _local.conn = _open_connection()
+        _local.key = key
+        # Every entry point goes through here, so none can run before the schema
+        init_db()
+    return _local.conn
+
+def close_connection():
+    """Close this thread's connection, if one is open"""
+    conn = getattr(_local, 'conn', None)
+    if conn is not None and getattr(_local, 'key', (None,))[0] == os.getpid():
+        conn.close()
+    _local.conn = _local.key = None
+
+@contextmanager
+def transaction(immediate=False):
+    """Run a block in one transaction on this thread's connection
+
+    Commits on success and rolls back on error. immediate=True takes the
+    write lock up front. A transaction opened inside another one joins it.
+    """
+    conn = get_connection()
+    if conn.in_transaction:
+        yield conn
+        return
+    conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
     conn.commit()
-    conn.close()
 
+_columnar_store = None
+
+def columnar_store():
+    """The ArrowStudentStore when STUDENT_STORE is 'arrow', else None"""
+    global _columnar_store
+    if STUDENT_STORE != 'arrow':
+        return None
+    if _columnar_store is None:
+        from columnar import ArrowStudentStore
+        _columnar_store = ArrowStudentStore()
+    return _columnar_store
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+def student_snapshot():
+    """The StudentSnapshot of the current data version, rebuilt after changes
+
+    Costs one data_version lookup when nothing has changed. Threads that
+    find it stale wait for a single rebuild instead of each doing one.
+    """
+    global _snapshot
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == get_data_version():
+        return snapshot
+    with _snapshot_lock:
+        # Version and rows read in one transaction, so they agree
+        with transaction() as conn:
+            version = conn.execute("SELECT version FROM data_version").fetchone()[0]
+            if _snapshot is None or _snapshot.version != version:
+                from snapshot import StudentSnapshot
+                _snapshot = StudentSnapshot(conn, version)
+        return _snapshot
+
+def read_store():
+    """The store analytics reads are served from, or None for SQLite itself"""
+    if STUDENT_STORE == 'snapshot':
+        return student_snapshot()
+    return columnar_store()
+
+def sync_columnar_store(partitions=None):
+    """Rewrite the given columnar partitions (all of them if None) from SQLite
+
+    The rows are read in a plain read transaction (a WAL snapshot), so
+    uploads keep committing while the files are written; a partition is
+    rewritten whole, which after a large upload is most of the store.
+    Syncs hold the store's sync_lock() so they apply in order, and only a
+    sync whose snapshot is still current marks the store synced; otherwise
+    the sync of the upload that committed meanwhile does.
+    """
+    store = columnar_store()
+    if store is None:
+        return
+    with store.sync_lock():
+        with transaction() as conn:
+            # The first read fixes the snapshot the partitions are read from
+            version = conn.execute("SELECT version FROM data_version").fetchone()[0]
+            if partitions is None:
+                store.rebuild(conn)
+            else:
+                store.sync_partitions(conn, partitions)
+        # Briefly under the write lock: no upload can mark the store unsynced
+        # between this check and the marker
+        with transaction(immediate=True) as conn:
+            if conn.execute("SELECT version FROM data_version").fetchone()[0] == version:
+                store.mark_synced()
+            # The upload bumped the version before its partitions were
+            # rewritten, so results computed from the store in between were
+            # cached under it; a new version retires them
+            _bump_data_version(conn)
+
+def _migrate_legacy_table(conn):
+    """Rebuild a students table written by to_sql (no primary key)"""
+    info = conn.execute("PRAGMA table_info(students)").fetchall()
+    if any(row[1] == 'student_id' and row[5] for row in info):
+        return
+
+    existing = [row[1] for row in info if row[1] in STUDENT_COLUMNS]
+    cols = ", ".join(existing)
+    conn.execute(CREATE_STUDENTS_TABLE.format(table='students_migrated'))
+    conn.execute(
+        f"INSERT OR REPLACE INTO students_migrated ({cols}) SELECT {cols} FROM students"
+    )
+    conn.execute("DROP TABLE students")
+    conn.execute("ALTER TABLE students_migrated RENAME TO students")
+
+def init_db():
+    """Create or migrate the schema of DB_NAME, once per process
+
+    Called by get_connection() whenever it opens a connection, so callers
+    never need to; costs a set lookup once the schema is in place.
+    """
+    # Opening this thread's connection may itself have run the setup
+    get_connection()
+    if DB_NAME in _schema_ready:
+        return
+    with _schema_lock:
+        if DB_NAME not in _schema_ready:
+            _create_schema()
+            _schema_ready.add(DB_NAME)
+
+def _create_schema():
+    # WAL is persistent, so setting it once here covers every later connection
+    get_connection().execute("PRAGMA journal_mode = WAL")
+    with transaction() as conn:
+        conn.execute(CREATE_STUDENTS_TABLE.format(table='students'))
+        _migrate_legacy_table(conn)
+        for name, column in STUDENT_INDEXES.items():
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON students ({column})")
+        conn.execute(CREATE_TRAINING_JOBS_TABLE)
+        conn.execute(CREATE_SUMMARY_TABLE)
+        conn.execute(CREATE_DATA_VERSION_TABLE)
+        conn.execute("INSERT OR IGNORE INTO data_version (id, version) VALUES (0, 0)")
+        conn.execute(segments.CREATE_SEGMENT_CUBE_TABLE)
+        if conn.execute("SELECT COUNT(*) FROM student_summary").fetchone()[0] == 0:
+            # First run on this database: build the summary with one full scan
+            _apply_summary_delta(conn, conn.execute(SUMMARY_SELECT).fetchone())
+        if conn.execute(
+            "SELECT EXISTS (SELECT 1 FROM students) AND NOT EXISTS (SELECT 1 FROM segment_cube)"
+        ).fetchone()[0]:
+            # Students but no cube (a database from before it existed): build it
+            segments.rebuild(conn)
+
+    store = columnar_store()
+    if store is not None and not store.is_synced():
+        # First run, or a crash between an upload and its partition sync
+        sync_columnar_store()
+
+def _apply_summary_delta(conn, delta):
+    """Add a row of SUMMARY_AGGREGATES values onto the stored summary"""
+    conn.executemany(
+        "INSERT INTO student_summary (metric, value) VALUES (?, ?) "
+        "ON CONFLICT(metric) DO UPDATE SET value = value + excluded.value",
+        zip(SUMMARY_AGGREGATES, delta)
+    )
+
+def _bump_data_version(conn):
+    conn.execute("UPDATE data_version SET version = version + 1")
+
+def get_data_version():
+    """Counter that changes whenever students are added, updated or cleared"""
+    return get_connection().execute("SELECT version FROM data_version").fetchone()[0]
+
+def lookup_chunks(keys):
+    """Yield (chunk, placeholders) for an IN (...) lookup of keys
+
+    Chunks hold at most LOOKUP_CHUNK_SIZE keys; placeholders is the
+    matching "?, ?, ..." string.
+    """
+    for start in range(0, len(keys), LOOKUP_CHUNK_SIZE):
+        chunk = keys[start:start + LOOKUP_CHUNK_SIZE]
+        yield chunk, ", ".join("?" for _ in chunk)
+
+def _summarize_ids(conn, student_ids):
+    """Aggregate SUMMARY_AGGREGATES over the given students, in chunks"""
+    totals = [0] * len(SUMMARY_AGGREGATES)
+    for chunk, marks in lookup_chunks(student_ids):
+        row = conn.execute(f"{SUMMARY_SELECT} WHERE student_id IN ({marks})", chunk).fetchone()
+        totals = [t + v for t, v in zip(totals, row)]
+    return totals
+
+@timed('db_write')
 def add_students(df):
-    """Add new students to the database (upsert)"""
-    conn = sqlite3.connect(DB_NAME)
-    # Using 'replace' to handle duplicates (updates existing records)
-    # Ideally we'd use upsert, but replace is simpler for this scope
-    df.to_sql('students', conn, if_exists='replace', index=False)
-    conn.close()
-    return len(df)
-
-def get_all_students():
-    """Retrieve all students from the database"""
-    if not os.path.exists(DB_NAME):
-        return []
-    
-    conn = sqlite3.connect(DB_NAME)
-    try:
-        df = pd.read_sql_query("SELECT * FROM students", conn)
-        return df.to_dict('records')
-    except Exception:
-        return []
-    finally:
-        conn.close()
+    """Add new students to the database (upsert on student_id)
 
-def get_student_dataframe():
-    """Retrieve all students as a pandas DataFrame"""
-    if not os.path.exists(DB_NAME):
-        return pd.DataFrame()
-    
-    conn = sqlite3.connect(DB_NAME)
+    Returns a dict with the number of rows inserted, updated and skipped
+    (no student_id), and the columnar partitions the upload touched (pass
+    them to sync_columnar_store).
+    """
+    columns = [col for col in STUDENT_COLUMNS if col in df.columns]
+    # Rows without an id are skipped: cast to str they would all upsert
+    # onto one student with the id 'None'
+    missing_id = df['student_id'].isnull()
+    # Last occurrence wins when an upload repeats a student_id
+    df = df.loc[~missing_id, columns].drop_duplicates(subset='student_id', keep='last')
+    df = df.astype(object).where(df.notnull(), None)
+    df['student_id'] = df['student_id'].astype(str)
+
+    col_list = ", ".join(columns)
+    placeholders = ", ".join("?" for _ in columns)
+    updates = ", ".join(f"{col} = excluded.{col}" for col in columns if col != 'student_id')
+    sql = (
+        f"INSERT INTO students ({col_list}) VALUES ({placeholders}) "
+        f"ON CONFLICT(student_id) DO UPDATE SET {updates}"
+    )
+
+    student_ids = df['student_id'].tolist()
+    rows = list(df.itertuples(index=False, name=None))
+
+    store = columnar_store()
+    partitions = set()
+    with transaction(immediate=True) as conn:
+        # Aggregate of the rows about to be overwritten (COUNT(*) = updates)
+        before = _summarize_ids(conn, student_ids)
+        updated = int(before[0])
+        cells_before = segments.aggregate_students(conn, student_ids) if updated else {}
+        if store is not None:
+            partitions = _partition_values(conn, df, student_ids)
+            # Out of sync until sync_columnar_store() rewrites the partitions
+            store.mark_unsynced()
+
+        for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+            conn.executemany(sql, rows[start:start + UPSERT_CHUNK_SIZE])
+
+        after = _summarize_ids(conn, student_ids)
+        _apply_summary_delta(conn, [a - b for a, b in zip(after, before)])
+        if set(segments.CUBE_COLUMNS) <= set(columns):
+            # Every cube column was written, so the upload holds the new values
+            cells_after = segments.aggregate_frame(df)
+        else:
+            cells_after = segments.aggregate_students(conn, student_ids)
+        segments.apply_delta(conn, cells_before, cells_after)
+        _bump_data_version(conn)
+
+    return {
+        'inserted': len(rows) - updated,
+        'updated': updated,
+        'skipped': int(missing_id.sum()),
+        'partitions': partitions
+    }
+
+def _partition_values(conn, df, student_ids):
+    """Columnar partitions an upsert of df touches: old and new values"""
+    from columnar import PARTITION_COLUMN
+
+    values = set(df[PARTITION_COLUMN]) if PARTITION_COLUMN in df.columns else set()
+    for chunk, marks in lookup_chunks(student_ids):
+        values.update(row[0] for row in conn.execute(
+            f"SELECT DISTINCT {PARTITION_COLUMN} FROM students WHERE student_id IN ({marks})",
+            chunk
+        ))
+    if PARTITION_COLUMN not in df.columns:
+        # New rows without the column land in the null partition
+        values.add(None)
+    return values
+
+@timed('db_read')
+def get_training_sample(max_rows, random_state=None):
+    """Bounded, stratified TrainingSample of all students (see training_data)
+
+    Streamed in batches from the snapshot or Arrow store when one is
+    configured, reading only the training columns; otherwise from SQLite.
+    """
+    from training_data import sample_store, sample_table
+
+    store = read_store()
+    if store is not None:
+        return sample_store(store, max_rows, random_state)
+    with transaction() as conn:
+        return sample_table(conn, max_rows, random_state)
+
+@timed('db_read')
+def get_dashboard_summary():
+    """Return the precomputed dashboard aggregates as a dict"""
+    conn = get_connection()
+    rows = conn.execute(SELECT_SUMMARY).fetchall()
+    return summary_from_rows(rows)
+
+def summary_from_rows(rows):
+    """Dashboard aggregates dict from (metric, value) rows"""
+    summary = dict.fromkeys(SUMMARY_AGGREGATES, 0)
+    summary.update(rows)
+    return summary
+
+@timed('db_read')
+def get_category_counts(column):
+    """Count students per value of a categorical column, most common first"""
+    if column not in CATEGORY_COLUMNS:
+        raise ValueError(f'Cannot group by column: {column}')
+
+    store = read_store()
+    if store is not None:
+        return store.category_counts(column)
+
+    conn = get_connection()
+    return dict(conn.execute(
+        f"SELECT {column}, COUNT(*) FROM students WHERE {column} IS NOT NULL "
+        f"GROUP BY {column} ORDER BY COUNT(*) DESC"
+    ).fetchall())
+
+@timed('db_read')
+def get_random_sample(columns, limit):
+    """Draw up to limit random rows of numeric columns inside SQLite
+
+    Returns a dict mapping each column to a list of values.
+    """
+    unknown = [col for col in columns if col not in NUMERIC_COLUMNS]
+    if unknown:
+        raise ValueError(f'Cannot sample columns: {", ".join(unknown)}')
+
+    store = read_store()
+    if store is not None:
+        return store.random_sample(columns, limit)
+
+    conn = get_connection()
+    rows = conn.execute(
+        f"SELECT {', '.join(columns)} FROM students ORDER BY RANDOM() LIMIT ?",
+        (limit,)
+    ).fetchall()
+    return {col: list(values) for col, values in zip(columns, zip(*rows))} if rows \
+        else {col: [] for col in columns}
+
+@timed('db_read')
+def get_binned_counts(x, y, bins):
+    """2D histogram of two numeric columns over bins x bins equal-width cells
+
+    Returns (x_edges, y_edges, counts) where counts[i][j] is the number of
+    students in x bin i and y bin j; each column's maximum falls in its
+    last bin. Binning runs inside SQLite (or on the columnar store), so
+    only the cell counts come back.
+    """
+    unknown = [col for col in (x, y) if col not in NUMERIC_COLUMNS]
+    if unknown:
+        raise ValueError(f'Cannot bin columns: {", ".join(unknown)}')
+
+    store = read_store()
+    if store is not None:
+        return store.binned_counts(x, y, bins)
+
+    conn = get_connection()
+    not_null = f"{x} IS NOT NULL AND {y} IS NOT NULL"
+    x_min, x_max, y_min, y_max = conn.execute(
+        f"SELECT MIN({x}), MAX({x}), MIN({y}), MAX({y}) FROM students WHERE {not_null}"
+    ).fetchone()
+    counts = np.zeros((bins, bins), dtype=np.int64)
+    if x_min is None:
+        return bin_edges(0, 1, bins), bin_edges(0, 1, bins), counts
+
+    x_edges, y_edges = bin_edges(x_min, x_max, bins), bin_edges(y_min, y_max, bins)
+    cells = conn.execute(
+        f"SELECT MIN(CAST(({x} - ?) / ? AS INTEGER), ?) AS bx, "
+        f"MIN(CAST(({y} - ?) / ? AS INTEGER), ?) AS by, COUNT(*) "
+        f"FROM students WHERE {not_null} GROUP BY bx, by",
+        (x_edges[0], x_edges[1] - x_edges[0], bins - 1,
+         y_edges[0], y_edges[1] - y_edges[0], bins - 1)
+    ).fetchall()
+    if cells:
+        bx, by, n = np.array(cells, dtype=np.int64).T
+        counts[bx, by] = n
+    return x_edges, y_edges, counts
+
+def get_stable_sample(columns, limit):
+    """Deterministic sample of up to limit rows of numeric columns
+
+    Keeps the students whose hashed student_id is smallest (a bottom-k
+    reservoir over a streaming scan), so the same data always gives the
+    same points and an upload only swaps in the new students that rank
+    lower. Rows with a missing value are skipped. Returns a dict mapping
+    each column to a list of values. (Only the cursor fetches count as
+    db_read time.)
+    """
+    unknown = [col for col in columns if col not in NUMERIC_COLUMNS]
+    if unknown:
+        raise ValueError(f'Cannot sample columns: {", ".join(unknown)}')
+
+    store = read_store()
+    if store is not None:
+        return store.stable_sample(columns, limit)
+
+    keys = np.empty(0, dtype=np.uint64)
+    values = np.empty((0, len(columns)))
+    for rows in iter_student_batches({}, ['student_id'] + columns):
+        batch = np.array([row[1:] for row in rows], dtype=float)
+        complete = ~np.isnan(batch).any(axis=1)
+        ids = [row[0] for row, ok in zip(rows, complete) if ok]
+        keys = np.concatenate([keys, sample_keys(ids)])
+        values = np.concatenate([values, batch[complete]])
+        keep = bottom_k(keys, limit)
+        keys, values = keys[keep], values[keep]
+    return {col: values[:, i].tolist() for i, col in enumerate(columns)}
+
+_segment_cube = None
+_segment_cube_lock = threading.Lock()
+
+@timed('db_read')
+def get_segments(dimensions, filters=None):
+    """Performance and risk per segment, grouped by demographic dimensions
+
+    Served from the segment cube: the stored cells are loaded once per data
+    version and rolled up in memory, so no query scans the students table.
+    filters maps dimensions to a value the segments are restricted to.
+    """
+    filters = filters or {}
+    unknown = [dim for dim in [*dimensions, *filters] if dim not in segments.SEGMENT_DIMENSIONS]
+    if unknown:
+        raise ValueError(f'Cannot segment by: {", ".join(unknown)}')
+
+    global _segment_cube
+    cube = _segment_cube
+    if cube is None or cube.version != get_data_version():
+        with _segment_cube_lock:
+            with transaction() as conn:
+                version = conn.execute("SELECT version FROM data_version").fetchone()[0]
+                if _segment_cube is None or _segment_cube.version != version:
+                    _segment_cube = segments.SegmentCube(conn, version)
+            cube = _segment_cube
+    return cube.query(dimensions, filters)
+
+def _student_query(filters, sort, descending, after=None):
+    """Build the WHERE and ORDER BY clauses and params for a student listing
+
+    filters may hold risk_level, major, min_performance, max_performance
+    and search (substring of student_id or major). after is the
+    (sort value, student_id) key of the last row already returned.
+    """
+    if sort not in SORT_COLUMNS:
+        raise ValueError(f'Cannot sort by column: {sort}')
+
+    where, params = [], []
+    if filters.get('risk_level'):
+        where.append("risk_level = ?")
+        params.append(filters['risk_level'])
+    if filters.get('major'):
+        where.append("major = ?")
+        params.append(filters['major'])
+    if filters.get('min_performance') is not None:
+        where.append("performance >= ?")
+        params.append(filters['min_performance'])
+    if filters.get('max_performance') is not None:
+        where.append("performance <= ?")
+        params.append(filters['max_performance'])
+    if filters.get('search'):
+        where.append("(student_id LIKE ? OR major LIKE ?)")
+        params += [f"%{filters['search']}%"] * 2
+
+    op, direction = ('<', 'DESC') if descending else ('>', 'ASC')
+    if after is not None:
+        if sort == 'student_id':
+            where.append(f"student_id {op} ?")
+            params.append(after[1])
+        else:
+            where.append(f"({sort}, student_id) {op} (?, ?)")
+            params += list(after)
+
+    where_clause = f" WHERE {' AND '.join(where)}" if where else ""
+    if sort == 'student_id':
+        order_clause = f" ORDER BY student_id {direction}"
+    else:
+        order_clause = f" ORDER BY {sort} {direction}, student_id {direction}"
+    return where_clause, order_clause, params
+
+@timed('db_read')
+def count_students(filters):
+    """Count the students matching a set of listing filters"""
+    where_clause, _, params = _student_query(filters, 'student_id', False)
+    conn = get_connection()
+    return conn.execute(
+        f"SELECT COUNT(*) FROM students{where_clause}", params
+    ).fetchone()[0]
+
+@timed('db_read')
+def get_students_page(filters, sort='student_id', descending=False, after=None, limit=100):
+    """Return one keyset page of students and the key to resume after it
+
+    The key is None when there are no more rows.
+    """
+    where_clause, order_clause, params = _student_query(filters, sort, descending, after)
+    conn = get_connection()
+    cursor = conn.execute(
+        f"SELECT {', '.join(STUDENT_COLUMNS)} FROM students"
+        f"{where_clause}{order_clause} LIMIT ?",
+        params + [limit + 1]
+    )
+    rows = [dict(zip(STUDENT_COLUMNS, row)) for row in cursor.fetchall()]
+
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, (rows[-1][sort], rows[-1]['student_id'])
+
+def iter_student_batches(filters, columns=None, sort='student_id', descending=False,
+                         after=None):
+    """Yield lists of row tuples straight from the sqlite cursor via fetchmany"""
+    columns = columns or STUDENT_COLUMNS
+    unknown = [col for col in columns if col not in STUDENT_COLUMNS]
+    if unknown:
+        raise ValueError(f'Unknown columns: {", ".join(unknown)}')
+
+    where_clause, order_clause, params = _student_query(filters, sort, descending, after)
+    cursor = get_connection().execute(
+        f"SELECT {', '.join(columns)} FROM students{where_clause}{order_clause}",
+        params
+    )
     try:
-        df = pd.read_sql_query("SELECT * FROM students", conn)
-        return df
-    except Exception:
-        return pd.DataFrame()
+        while True:
+            with timer('db_read'):
+                rows = cursor.fetchmany(STREAM_FETCH_SIZE)
+            if not rows:
+                break
+            yield rows
     finally:
-        conn.close()
+        # An unfinished statement would pin this thread's connection to an
+        # old snapshot, so release it even when the client disconnects
+        cursor.close()
+
+def iter_students(filters, sort='student_id', descending=False, after=None):
+    """Yield matching students as dicts straight from the sqlite cursor"""
+    for rows in iter_student_batches(filters, None, sort, descending, after):
+        for row in rows:
+            yield dict(zip(STUDENT_COLUMNS, row))
 
 def clear_data():
     """Clear all data from the database"""
-    if os.path.exists(DB_NAME):
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute("DELETE FROM students")
-        conn.commit()
-        conn.close()
+    with transaction() as conn:
+        conn.execute("DELETE FROM students")
+        conn.execute("UPDATE student_summary SET value = 0")
+        conn.execute("DELETE FROM segment_cube")
+        _bump_data_version(conn)
+    store = columnar_store()
+    if store is not None:
+        store.clear()
+
+def create_training_job(job_id, submitted_at):
+    """Record a newly queued training job"""
+    with transaction() as conn:
+        conn.execute(
+            "INSERT INTO training_jobs (job_id, status, stage, submitted_at) "
+            "VALUES (?, 'queued', 'queued', ?)",
+            (job_id, submitted_at)
+        )
+
+def update_training_job(job_id, **fields):
+    """Update columns of a training job record"""
+    unknown = set(fields) - set(TRAINING_JOB_COLUMNS)
+    if unknown:
+        raise ValueError(f'Unknown training job fields: {", ".join(sorted(unknown))}')
+
+    assignments = ", ".join(f"{col} = ?" for col in fields)
+    with transaction() as conn:
+        conn.execute(
+            f"UPDATE training_jobs SET {assignments} WHERE job_id = ?",
+            (*fields.values(), job_id)
+        )
+
+@timed('db_read')
+def get_training_job(job_id):
+    """Return a training job record as a dict, or None if unknown"""
+    conn = get_connection()
+    row = conn.execute(SELECT_TRAINING_JOB, (job_id,)).fetchone()
+    return dict(zip(TRAINING_JOB_COLUMNS, row)) if row else None
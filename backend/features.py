@@ -0,0 +1,91 @@
+import numpy as np
+
+# Model inputs, in the order the scaler and forest expect them
+FEATURES = ['attendance', 'study_hours', 'previous_grades',
+            'assignments_completed', 'participation']
+
+RISK_LEVELS = ['Low', 'Medium', 'High']
+
+def performance_score(attendance, study_hours, previous_grades,
+                      assignments_completed, participation):
+    """Heuristic performance score; works on scalars, arrays and Series alike"""
+    return (
+        attendance * 0.25 +
+        study_hours * 3 * 0.20 +
+        previous_grades * 0.30 +
+        assignments_completed * 0.15 +
+        (participation / 3 * 100) * 0.10
+    )
+
+def performance_from_frame(df):
+    """performance_score over the feature columns of a DataFrame"""
+    return performance_score(*(df[col] for col in FEATURES))
+
+def risk_levels(performance):
+    """Label performance >= 70 Low, >= 50 Medium, otherwise High"""
+    performance = np.asarray(performance, dtype=float)
+    return np.select(
+        [performance >= 70, performance >= 50],
+        RISK_LEVELS[:2],
+        default=RISK_LEVELS[2]
+    )
+
+def participation_levels(scores):
+    """Bucket 0-100 participation scores into levels 1-3
+
+    0-60: Low (1), 60-85: Medium (2), 85-100: High (3); missing scores
+    count as Medium.
+    """
+    scores = np.asarray(scores, dtype=float)
+    return np.select([scores < 60, scores < 85, scores >= 85], [1, 2, 3], default=2)
+
+def feature_matrix(df):
+    """The model feature columns of a DataFrame as a float ndarray"""
+    return df[FEATURES].to_numpy(dtype=float)
+
+def scatter_points(x, y):
+    """Pair two columns into chart points without per-row pandas access"""
+    return [{'x': a, 'y': b} for a, b in zip(np.asarray(x).tolist(), np.asarray(y).tolist())]
+
+def bin_edges(low, high, bins):
+    """Edges of bins equal-width bins spanning [low, high] (unit span if flat)"""
+    if high <= low:
+        high = low + 1
+    return np.linspace(low, high, bins + 1)
+
+def histogram2d(x, y, x_edges, y_edges):
+    """Cell counts of x, y over equal-width edges, binned as the SQL query does
+
+    Cell index is floor((v - first edge) / width), with the maximum folded
+    into the last cell; np.histogram2d places values that sit exactly on
+    an edge differently, so the stores would disagree.
+    """
+    bins_x, bins_y = len(x_edges) - 1, len(y_edges) - 1
+    bx = np.minimum(((x - x_edges[0]) / (x_edges[1] - x_edges[0])).astype(np.int64), bins_x - 1)
+    by = np.minimum(((y - y_edges[0]) / (y_edges[1] - y_edges[0])).astype(np.int64), bins_y - 1)
+    return np.bincount(bx * bins_y + by, minlength=bins_x * bins_y).reshape(bins_x, bins_y)
+
+def binned_points(x_edges, y_edges, counts):
+    """Non-empty cells of a 2D histogram as chart points at the cell centres"""
+    counts = np.asarray(counts)
+    x_centres = (x_edges[:-1] + x_edges[1:]) / 2
+    y_centres = (y_edges[:-1] + y_edges[1:]) / 2
+    ix, iy = np.nonzero(counts)
+    return [
+        {'x': x, 'y': y, 'count': n}
+        for x, y, n in zip(x_centres[ix].round(4).tolist(), y_centres[iy].round(4).tolist(),
+                           counts[ix, iy].tolist())
+    ]
+
+def sample_keys(student_ids):
+    """Stable pseudo-random uint64 per student id, for deterministic sampling"""
+    import pandas as pd
+
+    return pd.util.hash_array(np.asarray(student_ids, dtype=object))
+
+def bottom_k(keys, k):
+    """Indices of the k smallest keys, in key order"""
+    if len(keys) > k:
+        keep = np.argpartition(keys, k)[:k]
+        return keep[np.argsort(keys[keep])]
+    return np.argsort(keys)
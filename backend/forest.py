@@ -0,0 +1,207 @@
+import os
+
+import numpy as np
+
+# Node arrays stored per forest, one .npy file each so they can be memory-mapped
+ARRAY_NAMES = ['feature', 'threshold', 'left', 'right', 'value', 'roots']
+
+# Batches up to this size walk all trees in lock-step; larger ones go tree by tree
+LOCKSTEP_MAX_ROWS = 256
+
+# Rows traversed at once in the tree-by-tree path; small enough that the
+# per-row buffers stay in cache while every tree is walked
+PREDICT_CHUNK_ROWS = 8192
+
+class CompiledForest:
+    """A regression forest flattened into contiguous NumPy node arrays
+
+    All trees share one set of arrays: feature, threshold, left, right and
+    value per node, plus the root node of each tree. Leaves point to
+    themselves with an infinite threshold, so a row can keep stepping past
+    a leaf harmlessly. Thresholds are expressed in raw (unscaled) feature
+    units because the StandardScaler is folded in at compile time. Serving
+    needs only NumPy.
+    """
+
+    def __init__(self, feature, threshold, left, right, value, roots):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        # Children interleaved as [right, left] so one gather picks the branch
+        self.children = np.empty(2 * len(left), dtype=np.int32)
+        self.children[0::2] = right
+        self.children[1::2] = left
+        self.tree_depths = self._tree_depths()
+        self.depth = int(self.tree_depths.max()) if len(roots) else 0
+        # int64 copies of feature and children for the tree-by-tree path,
+        # made on its first use (np.take indexes fastest with intp indices)
+        self._wide = None
+
+    def _tree_depths(self):
+        """Length of the longest root-to-leaf path of each tree"""
+        node_depth = np.zeros(len(self.left), dtype=np.int32)
+        level = np.asarray(self.roots)
+        depth = 0
+        while len(level):
+            node_depth[level] = depth
+            # Internal nodes on this level; leaves are their own left child
+            level = level[self.left[level] != level]
+            level = np.concatenate([self.left[level], self.right[level]])
+            depth += 1
+        return np.maximum.reduceat(node_depth, self.roots) if len(self.roots) else node_depth
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def predict(self, X):
+        """Mean leaf value over all trees for each row of X"""
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X[None, :]
+        if len(X) <= LOCKSTEP_MAX_ROWS:
+            return self._predict_lockstep(X)
+        return np.concatenate([
+            self._predict_by_tree(X[start:start + PREDICT_CHUNK_ROWS])
+            for start in range(0, len(X), PREDICT_CHUNK_ROWS)
+        ])
+
+    def _predict_lockstep(self, X):
+        """Walk every (row, tree) pair down its tree at once (small batches)"""
+        n_rows, n_features = X.shape
+        n_trees = len(self.roots)
+        nodes = np.tile(self.roots, n_rows)
+        # Offset of each pair's row in the flattened X
+        row_offsets = np.repeat(np.arange(n_rows) * n_features, n_trees)
+        flat_X = X.ravel()
+        for _ in range(self.depth):
+            go_left = flat_X[row_offsets + self.feature[nodes]] <= self.threshold[nodes]
+            nodes = self.children[2 * nodes + go_left]
+        return self.value[nodes].reshape(n_rows, n_trees).mean(axis=1)
+
+    def _predict_by_tree(self, X):
+        """Walk all rows down one tree at a time (large batches, cache friendly)
+
+        Each level is a few np.take calls into preallocated buffers, so the
+        walk allocates nothing per level.
+        """
+        if self._wide is None:
+            self._wide = (self.feature.astype(np.int64), self.children.astype(np.int64))
+        feature, children = self._wide
+        n_rows, n_features = X.shape
+        row_offsets = np.arange(n_rows, dtype=np.int64) * n_features
+        flat_X = X.ravel()
+        total = np.zeros(n_rows)
+        nodes = np.empty(n_rows, dtype=np.int64)
+        index = np.empty(n_rows, dtype=np.int64)
+        values = np.empty(n_rows)
+        thresholds = np.empty(n_rows)
+        go_left = np.empty(n_rows, dtype=bool)
+        for root, depth in zip(self.roots.tolist(), self.tree_depths.tolist()):
+            nodes.fill(root)
+            for _ in range(depth):
+                np.take(feature, nodes, out=index)
+                index += row_offsets
+                np.take(flat_X, index, out=values)
+                np.take(self.threshold, nodes, out=thresholds)
+                np.less_equal(values, thresholds, out=go_left)
+                np.multiply(nodes, 2, out=index)
+                index += go_left
+                np.take(children, index, out=nodes)
+            total += self.value[nodes]
+        return total / len(self.roots)
+
+    def save(self, path):
+        """Write each node array to path/<name>.npy"""
+        os.makedirs(path, exist_ok=True)
+        for name in ARRAY_NAMES:
+            np.save(os.path.join(path, f'{name}.npy'), getattr(self, name))
+
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        """Load a forest written by save(), memory-mapped by default"""
+        return cls(*(
+            np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mmap_mode)
+            for name in ARRAY_NAMES
+        ))
+
+def _raw_thresholds(threshold, mean, scale):
+    """Fold StandardScaler into split thresholds exactly
+
+    sklearn sends a row left when float32((x - mean) / scale) <= threshold.
+    That test is monotone in x, so it equals x <= c for a cutoff c in raw
+    float64 units. c lies within a few float32 ulps of threshold * scale +
+    mean and is found by bisection, so results match sklearn bit for bit.
+    """
+    def goes_left(x):
+        return ((x - mean) / scale).astype(np.float32) <= threshold
+
+    guess = threshold * scale + mean
+    delta = scale * (np.abs(threshold) + 1) * 2.0 ** -20
+    lo, hi = guess - delta, guess + delta
+    # Widen any bracket that does not straddle the cutoff
+    while True:
+        bad_lo, bad_hi = ~goes_left(lo), goes_left(hi)
+        if not (bad_lo.any() or bad_hi.any()):
+            break
+        delta = delta * 2
+        lo = np.where(bad_lo, lo - delta, lo)
+        hi = np.where(bad_hi, hi + delta, hi)
+
+    # Invariant: goes_left(lo) and not goes_left(hi)
+    while True:
+        mid = lo + (hi - lo) / 2
+        open_ = (mid > lo) & (mid < hi)
+        if not open_.any():
+            return lo
+        left = goes_left(mid)
+        lo = np.where(open_ & left, mid, lo)
+        hi = np.where(open_ & ~left, mid, hi)
+
+def compile_forest(model, scaler=None):
+    """Flatten a fitted RandomForestRegressor (and its scaler) into a CompiledForest
+
+    Split thresholds on scaled inputs are converted to raw-unit cutoffs, so
+    the compiled forest takes unscaled feature rows.
+    """
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    n_features = model.n_features_in_
+    mean = getattr(scaler, 'mean_', None)
+    scale = getattr(scaler, 'scale_', None)
+    mean = np.zeros(n_features) if mean is None else np.asarray(mean, dtype=np.float64)
+    scale = np.ones(n_features) if scale is None else np.asarray(scale, dtype=np.float64)
+
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        n = tree.node_count
+        is_leaf = tree.children_left < 0
+        index = np.arange(n, dtype=np.int32) + offset
+
+        feature = np.where(is_leaf, 0, tree.feature).astype(np.int32)
+        threshold = np.full(n, np.inf)
+        split = ~is_leaf
+        threshold[split] = _raw_thresholds(
+            tree.threshold[split], mean[feature[split]], scale[feature[split]]
+        )
+
+        features.append(feature)
+        thresholds.append(threshold)
+        lefts.append(np.where(is_leaf, index, tree.children_left + offset).astype(np.int32))
+        rights.append(np.where(is_leaf, index, tree.children_right + offset).astype(np.int32))
+        values.append(np.asarray(tree.value, dtype=np.float64).reshape(n))
+        roots.append(offset)
+        offset += n
+
+    # Leaves read feature 0; the infinite threshold sends them "left" to themselves
+    return CompiledForest(
+        np.concatenate(features),
+        np.concatenate(thresholds),
+        np.concatenate(lefts),
+        np.concatenate(rights),
+        np.concatenate(values),
+        np.array(roots, dtype=np.int32)
+    )
@@ -0,0 +1,168 @@
+import pandas as pd
+import numpy as np
+
+from database import add_students, sync_columnar_store
+from features import participation_levels, performance_from_frame, risk_levels
+from training_data import UploadSample
+
+# Rows read, transformed and persisted at a time
+INGEST_CHUNK_SIZE = 50000
+
+# --- Mapping Logic for sample_data.csv ---
+# Map CSV columns to our internal schema
+COLUMN_MAPPING = {
+    'StudentID': 'student_id',
+    'AttendanceRate': 'attendance',
+    'StudyHoursPerWeek': 'study_hours',
+    'PreviousGPA': 'previous_grades',
+    'AssignmentScore': 'assignments_completed',
+    'ParticipationScore': 'participation',
+    'Major': 'major',
+    'YearOfStudy': 'year_of_study',
+    'Gender': 'gender',
+    'Ethnicity': 'ethnicity',
+    'ParentEducation': 'parent_education',
+    'FamilyIncome': 'family_income'
+}
+
+REQUIRED_COLUMNS = ['student_id', 'attendance', 'study_hours',
+                    'previous_grades', 'assignments_completed']
+
+# Columns filled with the file-wide mean when missing
+IMPUTED_COLUMNS = ['attendance', 'study_hours', 'previous_grades', 'assignments_completed']
+
+DEMOGRAPHIC_COLUMNS = ['major', 'year_of_study', 'gender', 'ethnicity',
+                       'parent_education', 'family_income']
+
+# Explicit dtypes, by internal name, so chunks never re-infer types
+COLUMN_DTYPES = {
+    'student_id': str,
+    'attendance': 'float64',
+    'study_hours': 'float64',
+    'previous_grades': 'float64',
+    'assignments_completed': 'float64',
+    'participation': 'float64',
+    'performance': 'float64',
+    **{col: str for col in DEMOGRAPHIC_COLUMNS}
+}
+
+def _read_dtypes(header):
+    """dtype mapping for the raw CSV column names in header"""
+    return {
+        col: COLUMN_DTYPES[COLUMN_MAPPING.get(col, col)]
+        for col in header if COLUMN_MAPPING.get(col, col) in COLUMN_DTYPES
+    }
+
+def _normalize(df, new_format):
+    """Rename and rescale a chunk of the new CSV format to our schema"""
+    if new_format:
+        df = df.rename(columns=COLUMN_MAPPING)
+
+        # Normalize GPA (4.0 scale) to percentage (100 scale)
+        # Assuming max GPA is 4.0
+        if 'previous_grades' in df.columns:
+            df['previous_grades'] = df['previous_grades'] * 25
+
+        # Normalize Participation Score (0-100) to 1-3 Level
+        # 0-60: Low (1), 60-85: Medium (2), 85-100: High (3)
+        if 'participation' in df.columns:
+            df['participation'] = participation_levels(df['participation'])
+    return df
+
+def _transform(df, means):
+    """Clean a normalized chunk and derive performance and risk_level"""
+    # --- Data Cleaning ---
+    # Fill missing numeric values with the mean over the whole file
+    for col in IMPUTED_COLUMNS:
+        df[col] = df[col].fillna(means[col])
+
+    if 'participation' not in df.columns:
+        df['participation'] = np.random.randint(1, 4, size=len(df))
+
+    # Ensure new demographic columns exist even if not in input (for old CSVs)
+    for col in DEMOGRAPHIC_COLUMNS:
+        if col not in df.columns:
+            df[col] = 'Unknown'
+
+    # --- Performance Calculation ---
+    if 'performance' not in df.columns or df['performance'].isnull().any():
+        df['performance'] = performance_from_frame(df)
+
+    # Clip performance to 0-100
+    df['performance'] = df['performance'].clip(0, 100)
+
+    # --- Risk Assessment ---
+    df['risk_level'] = risk_levels(df['performance'])
+    return df
+
+def _read_chunks(file, dtypes, usecols=None):
+    """Iterate over the CSV from the start in INGEST_CHUNK_SIZE chunks"""
+    file.seek(0)
+    return pd.read_csv(file, dtype=dtypes, usecols=usecols, chunksize=INGEST_CHUNK_SIZE)
+
+def ingest_csv(file, sample_size=None):
+    """Stream an uploaded CSV into the database chunk by chunk
+
+    Makes two passes over the (seekable) file: the first accumulates sums
+    and counts for mean-imputation, the second transforms each chunk and
+    upserts it. Peak memory is bounded by the chunk size plus sample_size
+    rows kept for training (None: every row; 0: none).
+
+    Raises ValueError if required columns are missing. Returns a dict with
+    total, inserted, updated, skipped (rows without a student_id), columns,
+    and new_rows (an UploadSample of the stored rows).
+    """
+    header = pd.read_csv(file, nrows=0).columns.tolist()
+    dtypes = _read_dtypes(header)
+    # Check if it's the new format
+    new_format = 'StudentID' in header
+    normalized = [COLUMN_MAPPING.get(col, col) for col in header] if new_format else header
+
+    # Fallback for old simple format (validation)
+    missing_cols = [col for col in REQUIRED_COLUMNS if col not in normalized]
+    if missing_cols:
+        raise ValueError(f'Missing required columns: {", ".join(missing_cols)}')
+
+    # Pass 1: streaming sums and counts for the imputed columns
+    raw_names = {COLUMN_MAPPING.get(col, col): col for col in header}
+    usecols = [raw_names[col] for col in IMPUTED_COLUMNS]
+    sums = dict.fromkeys(IMPUTED_COLUMNS, 0.0)
+    counts = dict.fromkeys(IMPUTED_COLUMNS, 0)
+    for chunk in _read_chunks(file, dtypes, usecols):
+        chunk = _normalize(chunk, new_format)
+        for col in IMPUTED_COLUMNS:
+            sums[col] += chunk[col].sum()
+            counts[col] += chunk[col].count()
+    means = {col: sums[col] / counts[col] if counts[col] else np.nan for col in IMPUTED_COLUMNS}
+
+    # Pass 2: transform and persist each chunk
+    total = inserted = updated = skipped = 0
+    columns = None
+    new_rows = UploadSample(sample_size)
+    partitions = set()
+    for chunk in _read_chunks(file, dtypes):
+        chunk = _transform(_normalize(chunk, new_format), means)
+        # --- Persistence ---
+        # Upserts on student_id; columns outside the DB schema are ignored
+        result = add_students(chunk)
+        total += len(chunk) - result['skipped']
+        inserted += result['inserted']
+        updated += result['updated']
+        skipped += result['skipped']
+        partitions |= result['partitions']
+        columns = columns or list(chunk.columns)
+        # Train only on rows that were stored
+        new_rows.add(chunk.loc[chunk['student_id'].notnull()])
+
+    # Rewrite each touched columnar partition once, not once per chunk
+    if partitions:
+        sync_columnar_store(partitions)
+
+    return {
+        'total': total,
+        'inserted': inserted,
+        'updated': updated,
+        'skipped': skipped,
+        'columns': columns or normalized,
+        'new_rows': new_rows
+    }
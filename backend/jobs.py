@@ -0,0 +1,42 @@
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from database import create_training_job, update_training_job
+
+class TrainingWorker:
+    """Run training jobs one at a time on a background thread
+
+    Jobs are queued on a single-worker executor so uploads return at once.
+    Each gunicorn worker has its own queue; fits in different workers are
+    serialized by the model registry's training lock. Job state lives in
+    the database, so any worker can answer a status request.
+    """
+
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='training')
+
+    def submit(self, fn, *args):
+        """Queue fn(*args, progress=callback) and return its job id"""
+        job_id = uuid.uuid4().hex
+        create_training_job(job_id, time.time())
+        self.executor.submit(self._run, job_id, fn, args)
+        return job_id
+
+    def _run(self, job_id, fn, args):
+        """Execute a job and record its outcome"""
+        update_training_job(job_id, status='running', stage='starting', started_at=time.time())
+
+        def progress(stage):
+            update_training_job(job_id, stage=stage)
+
+        try:
+            result = fn(*args, progress=progress)
+            update_training_job(
+                job_id, status='completed', stage='done',
+                result=str(result), finished_at=time.time()
+            )
+        except Exception as e:
+            update_training_job(
+                job_id, status='failed', error=str(e), finished_at=time.time()
+            )
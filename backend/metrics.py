@@ -0,0 +1,178 @@
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# Upper bounds (bytes) of the response size histogram buckets
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000, 100000000)
+
+# Send a Server-Timing header with the stage timings of each response
+SERVER_TIMING = os.environ.get('METRICS_SERVER_TIMING', '0') == '1'
+
+PREFIX = 'student_analytics_'
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _label_text(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = PREFIX + name
+        self.help = help
+        self.labelnames = labelnames
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(n, '') for n in self.labelnames)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self.lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f'{self.name}{_label_text(self.labelnames, key)} {value}')
+        return lines
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels, Prometheus style"""
+
+    def __init__(self, name, help, buckets, labelnames=()):
+        self.name = PREFIX + name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.labelnames = labelnames
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(n, '') for n in self.labelnames)
+        index = next((i for i, b in enumerate(self.buckets) if value <= b), len(self.buckets))
+        with self.lock:
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self.lock:
+            for key, (counts, total, count) in sorted(self.values.items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets + ('+Inf',), counts):
+                    cumulative += n
+                    labels = _label_text(self.labelnames, key, [('le', bound)])
+                    lines.append(f'{self.name}_bucket{labels} {cumulative}')
+                labels = _label_text(self.labelnames, key)
+                lines.append(f'{self.name}_sum{labels} {total}')
+                lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+REQUEST_SECONDS = Histogram(
+    'request_duration_seconds', 'Time from request start to last response byte',
+    LATENCY_BUCKETS, ('endpoint', 'method'))
+REQUESTS = Counter(
+    'requests_total', 'Requests served', ('endpoint', 'method', 'status'))
+RESPONSE_BYTES = Histogram(
+    'response_bytes', 'Response body size', SIZE_BUCKETS, ('endpoint',))
+RESPONSE_ROWS = Counter(
+    'response_rows_total', 'Student or prediction rows returned', ('endpoint',))
+STAGE_SECONDS = Histogram(
+    'stage_duration_seconds', 'Time spent in db_read, db_write, train, predict and serialize',
+    LATENCY_BUCKETS, ('stage',))
+
+METRICS = [REQUEST_SECONDS, REQUESTS, RESPONSE_BYTES, RESPONSE_ROWS, STAGE_SECONDS]
+
+class RequestTimings:
+    """Stage times and row count accumulated over one request"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages = {}
+        self.rows = 0
+
+    def server_timing(self):
+        """Server-Timing header value, durations in milliseconds"""
+        entries = [f'{stage};dur={seconds * 1000:.2f}' for stage, seconds in self.stages.items()]
+        entries.append(f'total;dur={(time.perf_counter() - self.start) * 1000:.2f}')
+        return ', '.join(entries)
+
+# RequestTimings of the request the current thread is serving, if any
+_local = threading.local()
+
+def begin_request():
+    """Start collecting timings for the request on this thread"""
+    _local.timings = RequestTimings()
+    return _local.timings
+
+def current_request():
+    return getattr(_local, 'timings', None)
+
+def end_request(timings, endpoint, method, status, nbytes):
+    """Record a finished request (call once its body has been fully sent)"""
+    endpoint = endpoint or 'unmatched'
+    REQUEST_SECONDS.observe(time.perf_counter() - timings.start, endpoint=endpoint, method=method)
+    REQUESTS.inc(endpoint=endpoint, method=method, status=status)
+    RESPONSE_BYTES.observe(nbytes, endpoint=endpoint)
+    if timings.rows:
+        RESPONSE_ROWS.inc(timings.rows, endpoint=endpoint)
+    if current_request() is timings:
+        _local.timings = None
+
+def add_rows(count):
+    """Count rows returned by the current request"""
+    timings = current_request()
+    if timings is not None:
+        timings.rows += count
+
+def record_stage(stage, seconds):
+    """Record one observation of stage, adding it to the current request"""
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    timings = current_request()
+    if timings is not None:
+        timings.stages[stage] = timings.stages.get(stage, 0) + seconds
+
+@contextmanager
+def timer(stage):
+    """Time a block as one observation of stage
+
+    Also added to the current request's Server-Timing entry when called
+    while serving a request (background training jobs are not).
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start)
+
+def timed(stage):
+    """Decorator form of timer()"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timer(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def render():
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
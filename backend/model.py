@@ -1,91 +1,380 @@
-import pandas as pd
 import numpy as np
-import joblib
 import os
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.preprocessing import StandardScaler
+import copy
+
+from features import FEATURES, performance_score, feature_matrix
+from forest import compile_forest
+from registry import ModelRegistry
+from cache import make_prediction_cache
+from metrics import timed, timer
+from training_data import sample_frame
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-MODEL_FILE = os.path.join(BASE_DIR, "student_model.pkl")
-SCALER_FILE = os.path.join(BASE_DIR, "scaler.pkl")
+# Pre-registry artifacts, loaded only while the registry is still empty
+LEGACY_MODEL_FILE = os.path.join(BASE_DIR, "student_model.pkl")
+LEGACY_SCALER_FILE = os.path.join(BASE_DIR, "scaler.pkl")
+
+# How uploads update the model:
+#   full       - refit the whole forest on the full table (original behaviour)
+#   warm_start - grow the forest with trees fitted on the uploaded rows only
+#   drift      - refit only once enough new rows have arrived since the last fit
+TRAINING_POLICY = os.environ.get('MODEL_TRAINING_POLICY', 'warm_start')
+# Trees added per upload under the warm_start policy
+WARM_START_TREES = int(os.environ.get('MODEL_WARM_START_TREES', 10))
+# Uploaded rows below which warm_start does not grow the forest: a handful
+# of rows would otherwise decide WARM_START_TREES trees on their own. Such
+# uploads only add to pending_rows, and refit fully once those reach
+# RETRAIN_FRACTION as under drift
+WARM_START_MIN_ROWS = int(os.environ.get('MODEL_WARM_START_MIN_ROWS', 1000))
+# Uploaded rows a warm start fits on; larger uploads are sampled uniformly
+# while ingesting, so the upload never sits in memory whole (0: every row)
+WARM_START_MAX_ROWS = int(os.environ.get('MODEL_WARM_START_MAX_ROWS', 100000))
+# Forest size at which warm_start falls back to a full refit
+MAX_FOREST_TREES = int(os.environ.get('MODEL_MAX_FOREST_TREES', 300))
+# New rows, as a fraction of the rows last fitted on, that trigger a refit
+RETRAIN_FRACTION = float(os.environ.get('MODEL_RETRAIN_FRACTION', 0.2))
+
+def _optional_int(name):
+    """Env var as a positive int, or None when unset/empty"""
+    value = os.environ.get(name, '').strip()
+    if not value:
+        return None
+    if not value.isdigit() or int(value) < 1:
+        raise ValueError(f'{name} must be a positive integer, got {value!r}')
+    return int(value)
+
+def _optional_samples(name):
+    """Env var as a row count (int) or a fraction in (0, 1] (float), or None"""
+    value = os.environ.get(name, '').strip()
+    if not value:
+        return None
+    try:
+        number = int(value) if value.isdigit() else float(value)
+    except ValueError:
+        number = None
+    if number is None or not 0 < number or (isinstance(number, float) and number > 1):
+        raise ValueError(f'{name} must be a row count or a fraction in (0, 1], got {value!r}')
+    return number
+
+# Forest hyperparameters used by full refits
+# Trees per full fit
+N_ESTIMATORS = int(os.environ.get('MODEL_N_ESTIMATORS', 100))
+# Cores used to fit trees (-1: all of them)
+N_JOBS = int(os.environ.get('MODEL_N_JOBS', -1))
+# Tree depth limit (None: grow until leaves are pure); shallower trees
+# fit, load and predict faster
+MAX_DEPTH = _optional_int('MODEL_MAX_DEPTH')
+# Bootstrap sample drawn per tree: a row count, or a fraction of the rows
+MAX_SAMPLES = _optional_samples('MODEL_MAX_SAMPLES')
+# Rows a full fit trains on; larger tables are subsampled, stratified by
+# risk level, so training memory stays bounded (0: always use every row)
+MAX_TRAINING_ROWS = int(os.environ.get('MODEL_MAX_TRAINING_ROWS', 1000000))
+RANDOM_STATE = 42
+
+def forest_params(**overrides):
+    """RandomForestRegressor keyword arguments for a full fit"""
+    params = {
+        'n_estimators': N_ESTIMATORS,
+        'n_jobs': N_JOBS,
+        'max_depth': MAX_DEPTH,
+        'max_samples': MAX_SAMPLES,
+        'random_state': RANDOM_STATE
+    }
+    params.update(overrides)
+    return params
+
+def upload_sample_size():
+    """Rows of an upload to keep for train_incremental (see ingest_csv)
+
+    Only warm starts fit on the uploaded rows; the other policies just
+    count them.
+    """
+    if TRAINING_POLICY != 'warm_start':
+        return 0
+    return WARM_START_MAX_ROWS or None
+
+def _max_samples_for(max_samples, n_rows):
+    """max_samples usable on n_rows (sklearn rejects counts above n_rows)"""
+    if isinstance(max_samples, int) and max_samples >= n_rows:
+        return None
+    return max_samples
 
 class StudentModel:
-    def __init__(self):
-        self.model = None
-        self.scaler = None
-        self.features = ['attendance', 'study_hours', 'previous_grades', 
-                        'assignments_completed', 'participation']
-        self.load_model()
+    """Student performance model
+
+    Predictions run on a CompiledForest (NumPy only). The sklearn forest and
+    scaler it was compiled from are loaded lazily, and only for training.
+    With load=False the model is read on first use (see refresh()) instead
+    of at construction.
+    """
+
+    def __init__(self, registry=None, cache=None, load=True):
+        self.registry = registry or ModelRegistry()
+        # Single-student predictions keyed by (version, feature tuple)
+        self.cache = cache or make_prediction_cache()
+        # Registry version currently being served (None: legacy or untrained)
+        self.version = None
+        # (forest, model, scaler) replaced as one tuple so readers never see a
+        # mix; model and scaler stay None until training needs them
+        self.artifacts = (None, None, None)
+        self.importances = {}
+        # Rows seen by the last full fit, and rows uploaded since then
+        self.trained_rows = 0
+        self.pending_rows = 0
+        self.features = FEATURES
+        self.loaded = False
+        if load:
+            self.load_model()
+
+    @property
+    def forest(self):
+        return self.artifacts[0]
+
+    @property
+    def model(self):
+        return self.artifacts[1]
+
+    @property
+    def scaler(self):
+        return self.artifacts[2]
 
     def load_model(self):
-        """Load model and scaler from disk if they exist"""
-        if os.path.exists(MODEL_FILE) and os.path.exists(SCALER_FILE):
-            try:
-                self.model = joblib.load(MODEL_FILE)
-                self.scaler = joblib.load(SCALER_FILE)
-            except Exception as e:
-                print(f"Error loading model: {e}")
-                self.model = None
-                self.scaler = None
-
-    def train(self, df):
-        """Train the model and save it"""
+        """Load the published model version (or legacy pickles) if any exist"""
+        self.loaded = True
+        version = self.registry.current_version()
+        try:
+            if version is not None:
+                forest, meta = self.registry.load(version)
+                model = scaler = None
+                if forest is None:
+                    # Published before compiled forests existed
+                    model, scaler = self.registry.load_estimators(version)
+                    forest = compile_forest(model, scaler)
+                self.trained_rows = meta.get('trained_rows', 0)
+                self.pending_rows = meta.get('pending_rows', 0)
+                self.importances = meta.get('feature_importances') or (
+                    dict(zip(self.features, model.feature_importances_.tolist()))
+                    if model is not None else {}
+                )
+                # Artifacts before version: see predict()
+                self.artifacts = (forest, model, scaler)
+                self.version = version
+                self.cache.clear()
+            elif os.path.exists(LEGACY_MODEL_FILE) and os.path.exists(LEGACY_SCALER_FILE):
+                import joblib
+
+                model, scaler = joblib.load(LEGACY_MODEL_FILE), joblib.load(LEGACY_SCALER_FILE)
+                self.importances = dict(zip(self.features, model.feature_importances_.tolist()))
+                self.artifacts = (compile_forest(model, scaler), model, scaler)
+        except Exception as e:
+            print(f"Error loading model: {e}")
+            self.artifacts = (None, None, None)
+
+    def refresh(self):
+        """Hot-reload when another process has published a newer version
+
+        Costs one stat() of the registry pointer when nothing has changed.
+        Also performs the first load of a model built with load=False.
+        """
+        if not self.loaded:
+            self.load_model()
+            return
+        version = self.registry.current_version()
+        if version is not None and version != self.version:
+            self.load_model()
+
+    def _estimators(self):
+        """The sklearn (model, scaler) behind the served forest, loaded on demand"""
+        forest, model, scaler = self.artifacts
+        if model is None and self.version is not None:
+            model, scaler = self.registry.load_estimators(self.version)
+            if self.artifacts[0] is forest:
+                self.artifacts = (forest, model, scaler)
+        return model, scaler
+
+    def train(self, df, progress=None, params=None, max_rows=None):
+        """Train the model on a DataFrame and save it
+
+        params overrides forest_params() and max_rows MAX_TRAINING_ROWS.
+        """
         if df.empty:
             return False
-
-        # Calculate performance if not present (logic preserved from original app.py)
         if 'performance' not in df.columns:
-             df['performance'] = (
-                df['attendance'] * 0.25 +
-                df['study_hours'] * 3 * 0.20 +
-                df['previous_grades'] * 0.30 +
-                df['assignments_completed'] * 0.15 +
-                (df['participation'] / 3 * 100) * 0.10
-            )
+            df = df.assign(performance=np.nan)
+        max_rows = MAX_TRAINING_ROWS if max_rows is None else max_rows
+        with self.registry.training_lock():
+            return self.fit_sample(sample_frame(df, max_rows, RANDOM_STATE), progress, params)
 
-        X = df[self.features]
-        y = df['performance']
+    @timed('train')
+    def fit_sample(self, sample, progress=None, params=None):
+        """Fit on a training_data.TrainingSample and save the model
 
-        self.scaler = StandardScaler()
-        X_scaled = self.scaler.fit_transform(X)
+        The sample's scaler was fitted on every row it was built from; the
+        forest is fitted on the sampled rows, scaled in place as float32
+        (the dtype trees split on), so no full-size copy is made.
+        """
+        from sklearn.ensemble import RandomForestRegressor
 
-        self.model = RandomForestRegressor(n_estimators=100, random_state=42)
-        self.model.fit(X_scaled, y)
+        progress = progress or (lambda stage: None)
+        if not sample.rows:
+            return False
+
+        progress('fitting')
+        X, y = sample.arrays()
+        scaler = sample.scaler
+        X_scaled = scaler.transform(X, copy=False)
+
+        params = forest_params(**(params or {}))
+        params['max_samples'] = _max_samples_for(params['max_samples'], len(y))
+        model = RandomForestRegressor(**params)
+        model.fit(X_scaled, y)
 
-        # Save model and scaler
-        joblib.dump(self.model, MODEL_FILE)
-        joblib.dump(self.scaler, SCALER_FILE)
+        # Swap in only once fitting is done; the old model serves until then
+        progress('saving')
+        # Rows in the table, not the sample, so drift compares like with like
+        self.trained_rows = sample.rows
+        self.pending_rows = 0
+        self._publish(model, scaler)
         return True
 
+    def train_incremental(self, upload, load_sample, progress=None):
+        """Update the model after an upload according to TRAINING_POLICY
+
+        upload is the UploadSample of the stored rows: all of them count
+        towards pending_rows and warm starts fit on its sample. load_sample(max_rows, random_state)
+        returns a TrainingSample of the full table and is only called when a
+        full refit is needed. progress(stage), if given,
+        is called as the update moves through its stages. Returns the action
+        taken: 'full', 'warm_start' or 'skipped'.
+        """
+        progress = progress or (lambda stage: None)
+        if not upload.rows:
+            return 'skipped'
+
+        with self.registry.training_lock():
+            return self._train_incremental(upload, load_sample, progress)
+
+    def _train_incremental(self, upload, load_sample, progress):
+        # Under the registry lock: the version served after refresh() is the
+        # latest published, and no other process publishes until this returns
+        self.refresh()
+        if self.version is not None:
+            # Every worker records its uploads in the served version's meta,
+            # so count on from there rather than from this process's copy
+            meta = self.registry.read_meta(self.version)
+            self.trained_rows = meta.get('trained_rows', 0)
+            self.pending_rows = meta.get('pending_rows', 0)
+        self.pending_rows += upload.rows
+        forest = self.forest
+        drifted = self.pending_rows >= RETRAIN_FRACTION * self.trained_rows
+        too_small = TRAINING_POLICY == 'warm_start' and upload.rows < WARM_START_MIN_ROWS
+        needs_full = (
+            forest is None or
+            TRAINING_POLICY == 'full' or
+            (TRAINING_POLICY == 'warm_start' and
+             forest.n_trees + WARM_START_TREES > MAX_FOREST_TREES) or
+            ((TRAINING_POLICY == 'drift' or too_small) and drifted)
+        )
+
+        if needs_full:
+            progress('loading data')
+            sample = load_sample(MAX_TRAINING_ROWS, RANDOM_STATE)
+            return 'full' if self.fit_sample(sample, progress) else 'skipped'
+
+        if TRAINING_POLICY != 'warm_start' or too_small:
+            self._save_meta()
+            return 'skipped'
+
+        # Grow a copy of the forest so the serving one is never half-fitted;
+        # the scaler stays fixed so old and new trees see the same inputs
+        progress('fitting')
+        X, y = upload.arrays()
+        with timer('train'):
+            model, scaler = self._estimators()
+            model = copy.deepcopy(model)
+            model.set_params(
+                warm_start=True,
+                n_estimators=len(model.estimators_) + WARM_START_TREES,
+                n_jobs=N_JOBS,
+                max_samples=_max_samples_for(model.max_samples, len(y))
+            )
+            model.fit(scaler.transform(X), y)
+
+        progress('saving')
+        # The new trees have learned the upload (through its sample), so its
+        # rows no longer count as drift
+        self.pending_rows -= upload.rows
+        self._publish(model, scaler)
+        return 'warm_start'
+
+    def _meta(self):
+        """Metadata stored with each version: policy counters and importances"""
+        return {
+            'trained_rows': self.trained_rows,
+            'pending_rows': self.pending_rows,
+            'feature_importances': self.importances
+        }
+
+    def _publish(self, model, scaler):
+        """Compile, publish as a new registry version and start serving it"""
+        forest = compile_forest(model, scaler)
+        self.importances = dict(zip(self.features, model.feature_importances_.tolist()))
+        version = self.registry.publish(model, scaler, self._meta(), forest)
+        # Artifacts before version: see predict()
+        self.artifacts = (forest, model, scaler)
+        self.version = version
+        self.cache.clear()
+
+    def _save_meta(self):
+        """Persist the row counters of the version being served"""
+        if self.version is not None:
+            self.registry.update_meta(self.version, self._meta())
+
+    @timed('predict')
     def predict(self, data):
         """Predict performance for a single student"""
-        if self.model is None or self.scaler is None:
+        self.refresh()
+        # Read the version before the forest: a concurrent swap then at worst
+        # caches a new-model score under the old (soon unreachable) version
+        version = self.version
+        forest = self.forest
+        key = (version, tuple(float(data[f]) for f in self.features))
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        if forest is None:
             # Fallback to heuristic calculation if model isn't trained
-            predicted_score = (
-                data['attendance'] * 0.25 +
-                data['study_hours'] * 3 * 0.20 +
-                data['previous_grades'] * 0.30 +
-                data['assignments_completed'] * 0.15 +
-                (data['participation'] / 3 * 100) * 0.10
-            )
-            return min(predicted_score, 100)
-
-        features_arr = np.array([[
-            data['attendance'],
-            data['study_hours'],
-            data['previous_grades'],
-            data['assignments_completed'],
-            data['participation']
-        ]])
-        
-        features_scaled = self.scaler.transform(features_arr)
-        predicted_score = self.model.predict(features_scaled)[0]
-        return min(predicted_score, 100)
+            predicted_score = min(performance_score(*key[1]), 100)
+        else:
+            features_arr = np.array([key[1]], dtype=float)
+            predicted_score = min(forest.predict(features_arr)[0], 100)
+
+        predicted_score = float(predicted_score)
+        self.cache.put(key, predicted_score)
+        return predicted_score
+
+    def predict_many(self, df):
+        """Predict performance for every row of a DataFrame in one pass"""
+        return self.predict_matrix(feature_matrix(df))
+
+    @timed('predict')
+    def predict_matrix(self, X):
+        """Predict performance for every row of a FEATURES-ordered float matrix"""
+        self.refresh()
+        forest = self.forest
+        if forest is None:
+            # Same heuristic as predict(), applied column-wise
+            predicted_scores = performance_score(*X.T)
+            return np.minimum(predicted_scores, 100)
+
+        predicted_scores = forest.predict(X)
+        return np.minimum(predicted_scores, 100)
 
     def get_feature_importance(self):
         """Return feature importance dict"""
-        if self.model is None:
+        self.refresh()
+        if self.forest is None:
             return {}
-        
-        importances = self.model.feature_importances_
-        return dict(zip(self.features, importances))
+
+        return dict(self.importances)
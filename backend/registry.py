@@ -0,0 +1,144 @@
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from forest import CompiledForest
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+REGISTRY_DIR = os.environ.get('MODEL_REGISTRY_DIR', os.path.join(BASE_DIR, 'models'))
+# Versions kept on disk after a publish (the current one is always kept)
+KEEP_VERSIONS = int(os.environ.get('MODEL_REGISTRY_KEEP', 5))
+
+POINTER_FILE = 'CURRENT'
+MODEL_FILE = 'model.pkl'
+SCALER_FILE = 'scaler.pkl'
+META_FILE = 'meta.json'
+FOREST_DIR = 'forest'
+LOCK_FILE = '.training.lock'
+
+# Fallback for platforms without fcntl: serializes training in this process only
+_local_training_lock = threading.Lock()
+
+class ModelRegistry:
+    """Versioned model artifacts published through an atomic pointer file
+
+    Each version is a directory holding model.pkl, scaler.pkl, meta.json and
+    forest/ (the compiled node arrays used for serving). A version is written
+    under a temporary name and renamed into place, then CURRENT is replaced
+    with os.replace, so readers only ever see complete versions. Arrays are
+    loaded with mmap_mode='r' so every worker process shares them through
+    the page cache.
+    """
+
+    def __init__(self, root=REGISTRY_DIR):
+        self.root = root
+        self.pointer = os.path.join(root, POINTER_FILE)
+        # (inode, mtime_ns, size) of CURRENT when it was last read, and its version
+        self._pointer_stat = None
+        self._current = None
+
+    def current_version(self):
+        """Return the published version, re-reading CURRENT only if it changed"""
+        try:
+            st = os.stat(self.pointer)
+        except FileNotFoundError:
+            return None
+
+        stat_key = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if stat_key != self._pointer_stat:
+            with open(self.pointer) as f:
+                self._current = f.read().strip() or None
+            self._pointer_stat = stat_key
+        return self._current
+
+    def load(self, version):
+        """Load (forest, meta) for a version; forest is None if not compiled"""
+        path = os.path.join(self.root, version)
+        meta = self.read_meta(version)
+        forest_path = os.path.join(path, FOREST_DIR)
+        forest = CompiledForest.load(forest_path) if os.path.isdir(forest_path) else None
+        return forest, meta
+
+    def read_meta(self, version):
+        """The metadata of a version as last written (see update_meta)"""
+        with open(os.path.join(self.root, version, META_FILE)) as f:
+            return json.load(f)
+
+    def load_estimators(self, version):
+        """Load the sklearn (model, scaler) of a version, memory-mapping arrays"""
+        import joblib
+
+        path = os.path.join(self.root, version)
+        model = joblib.load(os.path.join(path, MODEL_FILE), mmap_mode='r')
+        scaler = joblib.load(os.path.join(path, SCALER_FILE), mmap_mode='r')
+        return model, scaler
+
+    def publish(self, model, scaler, meta, forest=None):
+        """Write a new version and point CURRENT at it; returns the version"""
+        import joblib
+
+        os.makedirs(self.root, exist_ok=True)
+        # Millisecond prefix keeps versions sortable; the suffix avoids clashes
+        version = f"{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}"
+        tmp_path = os.path.join(self.root, f'.tmp-{version}')
+        os.makedirs(tmp_path)
+        joblib.dump(model, os.path.join(tmp_path, MODEL_FILE))
+        joblib.dump(scaler, os.path.join(tmp_path, SCALER_FILE))
+        if forest is not None:
+            forest.save(os.path.join(tmp_path, FOREST_DIR))
+        with open(os.path.join(tmp_path, META_FILE), 'w') as f:
+            json.dump({**meta, 'version': version}, f)
+        os.rename(tmp_path, os.path.join(self.root, version))
+
+        self._write_atomic(self.pointer, version)
+        self._prune(version)
+        return version
+
+    def update_meta(self, version, meta):
+        """Replace the metadata of an already published version"""
+        path = os.path.join(self.root, version, META_FILE)
+        self._write_atomic(path, json.dumps({**meta, 'version': version}))
+
+    @contextmanager
+    def training_lock(self):
+        """Hold an exclusive lock on the registry while a model is fitted
+
+        An flock on LOCK_FILE, so fits in different worker processes (each
+        with its own TrainingWorker) run one after another and each starts
+        from the version the previous one published. Not reentrant.
+        """
+        try:
+            import fcntl
+        except ImportError:
+            with _local_training_lock:
+                yield
+            return
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, LOCK_FILE), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _write_atomic(self, path, text):
+        """Write text to path via a temporary file and os.replace"""
+        tmp_path = f'{path}.{uuid.uuid4().hex[:8]}.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+    def _prune(self, current):
+        """Delete all but the newest KEEP_VERSIONS versions"""
+        versions = sorted(
+            name for name in os.listdir(self.root)
+            if os.path.isdir(os.path.join(self.root, name)) and not name.startswith('.')
+        )
+        for name in versions[:-KEEP_VERSIONS] if KEEP_VERSIONS > 0 else []:
+            if name != current:
+                # Workers still mapping these files keep their open inodes
+                shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
@@ -0,0 +1,157 @@
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from features import FEATURES
+
+# Threads scoring scenario chunks; forest traversal is NumPy work that
+# releases the GIL, so chunks score in parallel while the next is read
+SCENARIO_THREADS = int(os.environ.get('SCENARIO_THREADS', os.cpu_count() or 4))
+# Students read from the table and scored per chunk
+SCENARIO_CHUNK_SIZE = int(os.environ.get('SCENARIO_CHUNK_SIZE', 50000))
+# Operations a change may apply to a feature, in the order they are applied;
+# floor raises values below it, cap lowers values above it
+CHANGE_OPERATIONS = ['set', 'multiply', 'add', 'floor', 'cap']
+
+_executor = None
+
+def _pool():
+    """Scoring pool, created on first use so it is never inherited by a fork"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(SCENARIO_THREADS, thread_name_prefix='scenario')
+    return _executor
+
+def parse_changes(changes):
+    """Validate {feature: {operation: number}}; returns it with floats, in order"""
+    if not isinstance(changes, dict) or not changes:
+        raise ValueError('changes must map features to operations')
+    parsed = {}
+    for feature, operations in changes.items():
+        if feature not in FEATURES:
+            raise ValueError(f'Unknown feature: {feature}')
+        if not isinstance(operations, dict) or not operations:
+            raise ValueError(f'Changes to {feature} must map operations to numbers')
+        unknown = [op for op in operations if op not in CHANGE_OPERATIONS]
+        if unknown:
+            raise ValueError(f'Unknown operations: {", ".join(unknown)}')
+        for op, value in operations.items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError(f'{feature}.{op} must be a number')
+        parsed[feature] = {op: float(operations[op]) for op in CHANGE_OPERATIONS if op in operations}
+    return parsed
+
+def apply_changes(X, changes):
+    """Copy of a FEATURES-ordered matrix with parsed changes applied column-wise"""
+    X = X.copy()
+    for feature, operations in changes.items():
+        column = X[:, FEATURES.index(feature)]
+        if 'set' in operations:
+            column[:] = operations['set']
+        if 'multiply' in operations:
+            column *= operations['multiply']
+        if 'add' in operations:
+            column += operations['add']
+        if 'floor' in operations:
+            np.maximum(column, operations['floor'], out=column)
+        if 'cap' in operations:
+            np.minimum(column, operations['cap'], out=column)
+    return X
+
+def feature_chunks(batches, chunk_size=SCENARIO_CHUNK_SIZE):
+    """Regroup (student_id, *FEATURES) row batches into (ids, matrix, skipped) chunks
+
+    Rows with a missing feature are dropped and counted as skipped.
+    """
+    rows = []
+    for batch in batches:
+        rows.extend(batch)
+        while len(rows) >= chunk_size:
+            yield _to_matrix(rows[:chunk_size])
+            del rows[:chunk_size]
+    if rows:
+        yield _to_matrix(rows)
+
+def _to_matrix(rows):
+    X = np.array([row[1:] for row in rows], dtype=float)
+    complete = ~np.isnan(X).any(axis=1)
+    ids = np.array([row[0] for row in rows], dtype=object)[complete]
+    return ids, X[complete], int((~complete).sum())
+
+def tier_indices(scores, tiers):
+    """Position in tiers (best first, (minimum score, label)) of each score"""
+    thresholds = np.array([minimum for minimum, _ in tiers[:-1]])
+    return (scores[:, None] < thresholds).sum(axis=1)
+
+def _score_chunk(model, X, changes):
+    # One call, so both sides of a student are scored by the same model version
+    scores = model.predict_matrix(np.vstack([X, apply_changes(X, changes)]))
+    return scores[:len(X)], scores[len(X):]
+
+def run_scenario(model, chunks, changes, tiers, limit):
+    """Score every chunk as-is and under changes; summarize the difference
+
+    chunks yields (ids, matrix, skipped) as from feature_chunks. Chunks are
+    scored on the pool with a bounded number in flight, and collected in
+    order, so the students listed are the first (by scan order) up to
+    limit whose tier changes.
+    """
+    labels = [label for _, label in tiers]
+    n_tiers = len(tiers)
+    transitions = np.zeros(n_tiers * n_tiers, dtype=np.int64)
+    totals = {'students': 0, 'skipped': 0, 'before': 0.0, 'after': 0.0, 'changed': 0}
+    changed = []
+
+    def collect(ids, future):
+        before, after = future.result()
+        tier_before, tier_after = tier_indices(before, tiers), tier_indices(after, tiers)
+        transitions[:] += np.bincount(tier_before * n_tiers + tier_after, minlength=n_tiers * n_tiers)
+        totals['students'] += len(ids)
+        totals['before'] += float(before.sum())
+        totals['after'] += float(after.sum())
+        moved = np.flatnonzero(tier_before != tier_after)
+        totals['changed'] += len(moved)
+        for i in moved[:max(limit - len(changed), 0)].tolist():
+            changed.append({
+                'student_id': ids[i],
+                'score_before': round(float(before[i]), 2),
+                'score_after': round(float(after[i]), 2),
+                'risk_before': labels[tier_before[i]],
+                'risk_after': labels[tier_after[i]]
+            })
+
+    pending = deque()
+    for ids, X, skipped in chunks:
+        totals['skipped'] += skipped
+        pending.append((ids, _pool().submit(_score_chunk, model, X, changes)))
+        # Bound the chunks held in memory while reading stays ahead of scoring
+        if len(pending) > SCENARIO_THREADS:
+            collect(*pending.popleft())
+    while pending:
+        collect(*pending.popleft())
+
+    matrix = transitions.reshape(n_tiers, n_tiers)
+    before_counts = dict(zip(labels, matrix.sum(axis=1).tolist()))
+    after_counts = dict(zip(labels, matrix.sum(axis=0).tolist()))
+    n = totals['students']
+    return {
+        'students': n,
+        'skipped': totals['skipped'],
+        'average_score': {
+            'before': round(totals['before'] / n, 2) if n else None,
+            'after': round(totals['after'] / n, 2) if n else None
+        },
+        'risk_distribution': {
+            'before': before_counts,
+            'after': after_counts,
+            'shift': {label: after_counts[label] - before_counts[label] for label in labels}
+        },
+        'transitions': [
+            {'from': labels[i], 'to': labels[j], 'students': int(matrix[i, j])}
+            for i in range(n_tiers) for j in range(n_tiers) if i != j and matrix[i, j]
+        ],
+        'changed_total': totals['changed'],
+        'changed': changed
+    }
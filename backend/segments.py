@@ -0,0 +1,186 @@
+import json
+
+import numpy as np
+
+from features import RISK_LEVELS
+
+# Demographic columns segments can be grouped and filtered by
+SEGMENT_DIMENSIONS = [
+    'major', 'year_of_study', 'gender', 'ethnicity', 'parent_education', 'family_income'
+]
+# Performance histogram kept per cell: HISTOGRAM_BUCKETS equal buckets over
+# [0, HISTOGRAM_MAX), out-of-range scores clamped into the end buckets.
+# Percentiles are interpolated inside a bucket, so they are exact to
+# within HISTOGRAM_MAX / HISTOGRAM_BUCKETS points
+HISTOGRAM_BUCKETS = 100
+HISTOGRAM_MAX = 100.0
+PERCENTILES = [10, 25, 50, 75, 90]
+
+# Student columns the cube is computed from
+CUBE_COLUMNS = SEGMENT_DIMENSIONS + ['performance', 'risk_level']
+
+# Additive measures per cell, in stats order, followed by the histogram
+MEASURES = ['students', 'performance_count', 'performance_sum'] + \
+    [f'risk_{level.lower()}' for level in RISK_LEVELS]
+
+# Base cuboid: one row per combination of dimension values present in the
+# table. Every measure (histogram included) is additive, so an upload adds
+# the cells of the rows it wrote and subtracts those of the rows it replaced
+CREATE_SEGMENT_CUBE_TABLE = '''
+        CREATE TABLE IF NOT EXISTS segment_cube (
+            cell TEXT PRIMARY KEY,
+            stats BLOB NOT NULL
+        )
+    '''
+
+def _cell_key(values):
+    return json.dumps(list(values))
+
+def aggregate_students(conn, student_ids=None):
+    """{cell key: measures + histogram array} over some students (all if None)"""
+    import pandas as pd
+    # Imported here: database imports this module
+    from database import lookup_chunks
+
+    columns = CUBE_COLUMNS
+    select = f"SELECT {', '.join(columns)} FROM students"
+    if student_ids is None:
+        rows = conn.execute(select).fetchall()
+    else:
+        rows = []
+        for chunk, marks in lookup_chunks(student_ids):
+            rows += conn.execute(f"{select} WHERE student_id IN ({marks})", chunk).fetchall()
+    return aggregate_frame(pd.DataFrame(rows, columns=columns))
+
+def aggregate_frame(df):
+    """{cell key: measures + histogram array} over the rows of a DataFrame
+
+    df needs the SEGMENT_DIMENSIONS, performance and risk_level columns.
+    """
+    import pandas as pd
+
+    if df.empty:
+        return {}
+    codes = df.groupby(SEGMENT_DIMENSIONS, dropna=False, sort=False).ngroup().to_numpy()
+    n_cells = codes.max() + 1
+    _, first = np.unique(codes, return_index=True)
+    cells = df[SEGMENT_DIMENSIONS].iloc[first].astype(object)
+    # As stored in the TEXT columns, so uploaded and stored rows share keys
+    cells = cells.where(cells.isnull(), cells.astype(str)).where(cells.notnull(), None)
+
+    performance = pd.to_numeric(df['performance'], errors='coerce').to_numpy(dtype=float)
+    scored = ~np.isnan(performance)
+    buckets = np.clip(
+        (performance[scored] * HISTOGRAM_BUCKETS / HISTOGRAM_MAX).astype(np.int64),
+        0, HISTOGRAM_BUCKETS - 1
+    )
+
+    sums = np.zeros((n_cells, len(MEASURES) + HISTOGRAM_BUCKETS))
+    sums[:, 0] = np.bincount(codes, minlength=n_cells)
+    sums[:, 1] = np.bincount(codes, weights=scored, minlength=n_cells)
+    sums[:, 2] = np.bincount(codes, weights=np.where(scored, performance, 0), minlength=n_cells)
+    for i, level in enumerate(RISK_LEVELS):
+        weights = (df['risk_level'] == level).to_numpy(dtype=float)
+        sums[:, 3 + i] = np.bincount(codes, weights=weights, minlength=n_cells)
+    sums[:, len(MEASURES):] = np.bincount(
+        codes[scored] * HISTOGRAM_BUCKETS + buckets, minlength=n_cells * HISTOGRAM_BUCKETS
+    ).reshape(n_cells, HISTOGRAM_BUCKETS)
+
+    result = {}
+    for cell, row in zip(cells.itertuples(index=False, name=None), sums):
+        key = _cell_key(cell)
+        result[key] = result[key] + row if key in result else row
+    return result
+
+def apply_delta(conn, before, after):
+    """Add after and subtract before on the stored cells; drop emptied cells"""
+    from database import lookup_chunks
+
+    for chunk, marks in lookup_chunks(list(set(before) | set(after))):
+        stored = dict(conn.execute(
+            f"SELECT cell, stats FROM segment_cube WHERE cell IN ({marks})", chunk
+        ).fetchall())
+        upserts, deletes = [], []
+        for cell in chunk:
+            stats = np.frombuffer(stored[cell]).copy() if cell in stored \
+                else np.zeros(len(MEASURES) + HISTOGRAM_BUCKETS)
+            if cell in after:
+                stats += after[cell]
+            if cell in before:
+                stats -= before[cell]
+            if stats[0] <= 0:
+                deletes.append((cell,))
+            else:
+                upserts.append((cell, stats.tobytes()))
+        conn.executemany("INSERT OR REPLACE INTO segment_cube (cell, stats) VALUES (?, ?)", upserts)
+        conn.executemany("DELETE FROM segment_cube WHERE cell = ?", deletes)
+
+def rebuild(conn):
+    """Recompute every cell with one scan of the students table"""
+    conn.execute("DELETE FROM segment_cube")
+    apply_delta(conn, {}, aggregate_students(conn))
+
+class SegmentCube:
+    """The stored cells loaded as arrays, rolled up per query in NumPy
+
+    Grouping by any subset of SEGMENT_DIMENSIONS sums at most one row per
+    populated cell (a few thousand for the demographics here) however many
+    students the table holds.
+    """
+
+    def __init__(self, conn, version):
+        self.version = version
+        rows = conn.execute("SELECT cell, stats FROM segment_cube").fetchall()
+        self.cells = [json.loads(cell) for cell, _ in rows]
+        width = len(MEASURES) + HISTOGRAM_BUCKETS
+        self.stats = np.array([np.frombuffer(stats) for _, stats in rows]).reshape(-1, width)
+
+    def query(self, dimensions, filters=None):
+        """Segments grouped by dimensions, restricted to cells matching filters
+
+        filters maps dimensions to the value they must equal. Returns a list
+        of segment dicts, largest first.
+        """
+        filters = filters or {}
+        index = [SEGMENT_DIMENSIONS.index(dim) for dim in dimensions]
+        match = [
+            i for i, cell in enumerate(self.cells)
+            if all(cell[SEGMENT_DIMENSIONS.index(dim)] == value for dim, value in filters.items())
+        ]
+        groups = {}
+        for i in match:
+            key = tuple(self.cells[i][j] for j in index)
+            groups.setdefault(key, []).append(i)
+
+        segments = []
+        for key, rows in groups.items():
+            stats = self.stats[rows].sum(axis=0)
+            measures = dict(zip(MEASURES, stats[:len(MEASURES)]))
+            count = measures['performance_count']
+            segments.append({
+                **dict(zip(dimensions, key)),
+                'students': int(measures['students']),
+                'average_performance': round(measures['performance_sum'] / count, 2) if count else None,
+                'percentiles': histogram_percentiles(stats[len(MEASURES):]),
+                'risk_distribution': {
+                    level: int(measures[f'risk_{level.lower()}']) for level in RISK_LEVELS
+                }
+            })
+        segments.sort(key=lambda segment: segment['students'], reverse=True)
+        return segments
+
+def histogram_percentiles(histogram):
+    """PERCENTILES of the performance histogram, interpolated within buckets"""
+    total = histogram.sum()
+    if total <= 0:
+        return {f'p{p}': None for p in PERCENTILES}
+    cumulative = np.cumsum(histogram)
+    width = HISTOGRAM_MAX / HISTOGRAM_BUCKETS
+    result = {}
+    for p in PERCENTILES:
+        target = total * p / 100
+        bucket = int(np.searchsorted(cumulative, target))
+        below = cumulative[bucket - 1] if bucket else 0
+        fraction = (target - below) / histogram[bucket] if histogram[bucket] else 0
+        result[f'p{p}'] = round((bucket + fraction) * width, 2)
+    return result
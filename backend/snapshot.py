@@ -0,0 +1,210 @@
+import numpy as np
+
+from features import bin_edges, bottom_k, histogram2d, sample_keys
+
+# Storage of each student column in the snapshot, in STUDENT_COLUMNS order:
+#   id       - UTF-8 bytes (plus a precomputed sampling key per row)
+#   float32  - missing values as NaN
+#   int8     - small integers; missing values as -1
+#   category - dictionary-encoded: integer codes into a list of values, -1 missing
+COLUMN_KINDS = {
+    'student_id': 'id',
+    'attendance': 'float32',
+    'study_hours': 'float32',
+    'previous_grades': 'float32',
+    'assignments_completed': 'float32',
+    'participation': 'int8',
+    'performance': 'float32',
+    'risk_level': 'category',
+    'major': 'category',
+    'year_of_study': 'category',
+    'gender': 'category',
+    'ethnicity': 'category',
+    'parent_education': 'category',
+    'family_income': 'category'
+}
+
+# Rows fetched from the cursor per batch while building
+BUILD_FETCH_SIZE = 10000
+
+def _widen(values):
+    """float32 values as float64 rounded to 7 significant digits
+
+    float32 keeps about 7 digits, so this gives back the decimals that were
+    stored (85.3, not 85.30000305) and matches what SQLite returns for them.
+    """
+    values = values.astype(np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        magnitude = np.floor(np.log10(np.abs(values)))
+    scale = 10.0 ** np.where(np.isfinite(magnitude), 6 - magnitude, 0)
+    return np.round(values * scale) / scale
+
+def _smallest_int(codes):
+    """Downcast integer codes to the narrowest signed type that holds them"""
+    for dtype in (np.int8, np.int16, np.int32):
+        if codes.max(initial=0) <= np.iinfo(dtype).max:
+            return codes.astype(dtype)
+    return codes
+
+class StudentSnapshot:
+    """Compact in-memory copy of the students table, one per worker process
+
+    Numeric columns are float32 (participation int8) and text columns are
+    dictionary-encoded, so a million students take tens of megabytes rather
+    than the hundreds a DataFrame of Python strings needs. A snapshot is
+    built in one read transaction and tagged with the data version it saw;
+    database.student_snapshot() rebuilds it once an upload or clear bumps
+    that version. Implements the same read methods as ArrowStudentStore.
+    """
+
+    def __init__(self, conn, version):
+        self.version = version
+        self.columns = {}
+        # Category values per dictionary-encoded column, indexed by code
+        self.categories = {}
+
+        names = list(COLUMN_KINDS)
+        mappings = {col: {} for col, kind in COLUMN_KINDS.items() if kind == 'category'}
+        parts = {col: [] for col in names}
+        cursor = conn.execute(f"SELECT {', '.join(names)} FROM students ORDER BY student_id")
+        try:
+            while True:
+                rows = cursor.fetchmany(BUILD_FETCH_SIZE)
+                if not rows:
+                    break
+                for col, values in zip(names, zip(*rows)):
+                    kind = COLUMN_KINDS[col]
+                    if kind == 'id':
+                        parts[col].append(np.char.encode(np.array(values, dtype=str), 'utf-8'))
+                    elif kind == 'category':
+                        mapping = mappings[col]
+                        parts[col].append(np.fromiter(
+                            (-1 if v is None else mapping.setdefault(v, len(mapping)) for v in values),
+                            dtype=np.int32, count=len(values)
+                        ))
+                    else:
+                        parts[col].append(np.array(values, dtype=np.float32))
+        finally:
+            cursor.close()
+
+        for col in names:
+            kind = COLUMN_KINDS[col]
+            empty = np.empty(0, dtype='S1' if kind == 'id' else np.float32)
+            values = np.concatenate(parts[col]) if parts[col] else empty
+            if kind == 'category':
+                values = _smallest_int(values.astype(np.int32))
+                self.categories[col] = list(mappings[col])
+            elif kind == 'int8':
+                values = np.where(np.isnan(values), -1, values).astype(np.int8)
+            self.columns[col] = values
+        # Hashed from the decoded ids, so samples match the other stores
+        self.sample_keys = sample_keys(np.char.decode(self.columns['student_id'], 'utf-8'))
+        self.num_rows = len(self.columns['student_id'])
+
+    @property
+    def nbytes(self):
+        """Bytes held by the column arrays"""
+        return sum(values.nbytes for values in self.columns.values()) + self.sample_keys.nbytes
+
+    def _missing(self, column):
+        values = self.columns[column]
+        kind = COLUMN_KINDS[column]
+        if kind == 'float32':
+            return np.isnan(values)
+        if kind in ('int8', 'category'):
+            return values < 0
+        return np.zeros(len(values), dtype=bool)
+
+    def _numeric(self, column, rows):
+        """A numeric column at rows (mask or indices) as float64, NaN for missing"""
+        values = self.columns[column][rows]
+        if COLUMN_KINDS[column] == 'int8':
+            return np.where(values < 0, np.nan, values).astype(np.float64)
+        return _widen(values)
+
+    def _values(self, column, rows):
+        """Python values of a numeric column for JSON, None for missing"""
+        values = self._numeric(column, rows)
+        as_int = COLUMN_KINDS[column] == 'int8'
+        return [None if v != v else (int(v) if as_int else v) for v in values.tolist()]
+
+    def dataframe(self, columns=None):
+        """Students as a DataFrame holding only the requested columns
+
+        Numbers stay float32 and text columns come back as pandas
+        Categoricals, so the frame shares the snapshot's compact layout.
+        """
+        import pandas as pd
+
+        data = {}
+        for col in columns or COLUMN_KINDS:
+            values = self.columns[col]
+            kind = COLUMN_KINDS[col]
+            if kind == 'id':
+                data[col] = np.char.decode(values, 'utf-8').astype(object)
+            elif kind == 'category':
+                data[col] = pd.Categorical.from_codes(values, self.categories[col])
+            elif kind == 'int8':
+                data[col] = np.where(values < 0, np.nan, values).astype(np.float32)
+            else:
+                data[col] = values
+        return pd.DataFrame(data)
+
+    def batches(self, columns, size):
+        """Rows in slices of size as {column: array}, like ArrowStudentStore.batches
+
+        Numbers come back as float64 (NaN missing), text as object arrays
+        (None missing); only one slice is decoded at a time.
+        """
+        # Category values indexed by code, with None last for code -1
+        lookups = {
+            col: np.array(self.categories[col] + [None], dtype=object)
+            for col in columns if COLUMN_KINDS[col] == 'category'
+        }
+        for start in range(0, self.num_rows, size):
+            rows = slice(start, start + size)
+            batch = {}
+            for col in columns:
+                kind = COLUMN_KINDS[col]
+                if kind == 'category':
+                    batch[col] = lookups[col][self.columns[col][rows]]
+                elif kind == 'id':
+                    batch[col] = np.char.decode(self.columns[col][rows], 'utf-8').astype(object)
+                else:
+                    batch[col] = self._numeric(col, rows)
+            yield batch
+
+    def category_counts(self, column):
+        """Students per non-null value of column, most common first"""
+        values = self.columns[column]
+        counts = np.bincount(values[values >= 0].astype(np.int64))
+        if COLUMN_KINDS[column] == 'category':
+            labels = self.categories[column]
+        else:
+            labels = range(len(counts))
+        result = {labels[i]: int(n) for i, n in enumerate(counts.tolist()) if n}
+        return dict(sorted(result.items(), key=lambda item: item[1], reverse=True))
+
+    def random_sample(self, columns, limit):
+        """Up to limit random rows of columns, as {column: list of values}"""
+        size = min(limit, self.num_rows)
+        indices = np.sort(np.random.default_rng().choice(self.num_rows, size, replace=False))
+        return {col: self._values(col, indices) for col in columns}
+
+    def binned_counts(self, x, y, bins):
+        """2D histogram of two columns; same contract as database.get_binned_counts"""
+        complete = ~(self._missing(x) | self._missing(y))
+        xs, ys = self._numeric(x, complete), self._numeric(y, complete)
+        if not len(xs):
+            return bin_edges(0, 1, bins), bin_edges(0, 1, bins), np.zeros((bins, bins), dtype=np.int64)
+        x_edges = bin_edges(xs.min(), xs.max(), bins)
+        y_edges = bin_edges(ys.min(), ys.max(), bins)
+        return x_edges, y_edges, histogram2d(xs, ys, x_edges, y_edges)
+
+    def stable_sample(self, columns, limit):
+        """Deterministic sample; same contract as database.get_stable_sample"""
+        complete = np.ones(self.num_rows, dtype=bool)
+        for col in columns:
+            complete &= ~self._missing(col)
+        rows = np.flatnonzero(complete)[bottom_k(self.sample_keys[complete], limit)]
+        return {col: self._numeric(col, rows).tolist() for col in columns}
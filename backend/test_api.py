@@ -21,6 +21,7 @@ def test_upload():
 STU001,90,20,85,95,3
 STU002,50,5,45,40,1
 STU003,75,15,70,80,2
+,60,10,60,60,2
 """
     files = {'file': ('test.csv', csv_content, 'text/csv')}
     
@@ -29,10 +30,28 @@ STU003,75,15,70,80,2
         assert resp.status_code == 200
         data = resp.json()
         assert data['total_students'] == 3
+        assert data['skipped'] == 1
         print("[OK] Data uploaded successfully (3 students)")
+        return data['training_job_id']
     except Exception as e:
         print(f"[FAIL] Upload failed: {e}")
 
+def test_training_status(job_id=None):
+    print("\nTesting Training Status Endpoint...")
+    try:
+        assert job_id is not None
+        for _ in range(30):
+            resp = requests.get(BASE_URL + f'/api/train/status/{job_id}')
+            assert resp.status_code == 200
+            data = resp.json()
+            if data['status'] in ('completed', 'failed'):
+                break
+            time.sleep(1)
+        assert data['status'] == 'completed'
+        print(f"[OK] Training job finished ({data['result']})")
+    except Exception as e:
+        print(f"[FAIL] Training status check failed: {e}")
+
 def test_dashboard():
     print("\nTesting Dashboard Endpoint...")
     try:
@@ -44,6 +63,61 @@ def test_dashboard():
     except Exception as e:
         print(f"[FAIL] Dashboard check failed: {e}")
 
+def test_students_pagination():
+    print("\nTesting Students Endpoint...")
+    try:
+        resp = requests.get(BASE_URL + '/api/students', params={'limit': 2, 'sort': 'performance'})
+        assert resp.status_code == 200
+        data = resp.json()
+        assert len(data['students']) <= 2
+        if data['next_cursor']:
+            resp = requests.get(BASE_URL + '/api/students',
+                                params={'limit': 2, 'sort': 'performance', 'cursor': data['next_cursor']})
+            assert resp.status_code == 200
+            first_ids = {s['student_id'] for s in data['students']}
+            assert not first_ids & {s['student_id'] for s in resp.json()['students']}
+        resp = requests.get(BASE_URL + '/api/students', params={'format': 'ndjson'})
+        assert resp.status_code == 200
+        assert len(resp.text.splitlines()) == data['total']
+        print(f"[OK] Students listing success: {data['total']} students")
+    except Exception as e:
+        print(f"[FAIL] Students listing failed: {e}")
+
+def test_analytics():
+    print("\nTesting Analytics Endpoint...")
+    try:
+        resp = requests.get(BASE_URL + '/api/analytics?bins=10')
+        assert resp.status_code == 200
+        data = resp.json()
+        assert data['scatter']['mode'] == 'binned'
+        cells = data['attendance_vs_performance']
+        total = requests.get(BASE_URL + '/api/dashboard').json()['stats']['total_students']
+        assert sum(cell['count'] for cell in cells) == total
+        assert 0 < len(cells) <= 100
+        first = requests.get(BASE_URL + '/api/analytics?scatter=sample').json()
+        second = requests.get(BASE_URL + '/api/analytics?scatter=sample').json()
+        assert first['grades_vs_assignments'] == second['grades_vs_assignments']
+        print(f"[OK] Analytics returned {len(cells)} binned cells and a stable sample")
+    except Exception as e:
+        print(f"[FAIL] Analytics failed: {e}")
+
+def test_segments():
+    print("\nTesting Segment Analytics Endpoint...")
+    try:
+        resp = requests.get(BASE_URL + '/api/analytics/segments?by=major,gender')
+        assert resp.status_code == 200
+        data = resp.json()
+        total = requests.get(BASE_URL + '/api/dashboard').json()['stats']['total_students']
+        assert data['total_students'] == total
+        segment = data['segments'][0]
+        assert set(segment['risk_distribution']) == {'Low', 'Medium', 'High'}
+        assert segment['percentiles']['p10'] <= segment['percentiles']['p90']
+        resp = requests.get(BASE_URL + '/api/analytics/segments?by=shoe_size')
+        assert resp.status_code == 400
+        print(f"[OK] Segments returned {len(data['segments'])} groups")
+    except Exception as e:
+        print(f"[FAIL] Segments failed: {e}")
+
 def test_prediction():
     print("\nTesting Prediction Endpoint...")
     payload = {
@@ -62,6 +136,42 @@ def test_prediction():
     except Exception as e:
         print(f"[FAIL] Prediction failed: {e}")
 
+def test_batch_prediction():
+    print("\nTesting Batch Prediction Endpoint...")
+    payload = [
+        {"student_id": "STU001", "attendance": 85, "study_hours": 20,
+         "previous_grades": 80, "assignments_completed": 90, "participation": 3},
+        {"student_id": "STU002", "attendance": 50, "study_hours": 5,
+         "previous_grades": 45, "assignments_completed": 40, "participation": 1}
+    ]
+    try:
+        resp = requests.post(BASE_URL + '/api/predict/batch', json=payload)
+        assert resp.status_code == 200
+        data = resp.json()
+        assert data['total'] == 2
+        assert [p['student_id'] for p in data['predictions']] == ['STU001', 'STU002']
+        print(f"[OK] Batch prediction success: {data['total']} students scored")
+    except Exception as e:
+        print(f"[FAIL] Batch prediction failed: {e}")
+
+def test_scenario():
+    print("\nTesting Scenario Endpoint...")
+    payload = {"changes": {"attendance": {"add": 10, "cap": 100}}}
+    try:
+        resp = requests.post(BASE_URL + '/api/predict/scenario', json=payload)
+        assert resp.status_code == 200
+        data = resp.json()
+        total = requests.get(BASE_URL + '/api/dashboard').json()['stats']['total_students']
+        assert data['students'] + data['skipped'] == total
+        distribution = data['risk_distribution']
+        assert sum(distribution['before'].values()) == sum(distribution['after'].values())
+        resp = requests.post(BASE_URL + '/api/predict/scenario',
+                             json={"changes": {"attendance": {"double": 2}}})
+        assert resp.status_code == 400
+        print(f"[OK] Scenario moved {data['changed_total']} students between risk levels")
+    except Exception as e:
+        print(f"[FAIL] Scenario failed: {e}")
+
 def test_export():
     print("\nTesting Export Endpoint...")
     try:
@@ -79,11 +189,30 @@ def test_export():
         traceback.print_exc()
         print(f"[FAIL] Export failed: {e}")
 
+def test_metrics():
+    print("\nTesting Metrics Endpoint...")
+    try:
+        resp = requests.get(BASE_URL + '/api/metrics')
+        assert resp.status_code == 200
+        assert 'text/plain' in resp.headers.get('Content-Type', '')
+        assert 'student_analytics_request_duration_seconds_bucket' in resp.text
+        assert 'endpoint="get_dashboard"' in resp.text
+        print("[OK] Metrics exposed in Prometheus format")
+    except Exception as e:
+        print(f"[FAIL] Metrics failed: {e}")
+
 if __name__ == '__main__':
     print("[WAIT] Waiting for server to be ready (ensure you ran 'python backend/app.py')...")
     time.sleep(2)
     test_home()
-    test_upload()
+    job_id = test_upload()
+    test_training_status(job_id)
     test_dashboard()
+    test_students_pagination()
+    test_analytics()
+    test_segments()
     test_prediction()
+    test_batch_prediction()
+    test_scenario()
     test_export()
+    test_metrics()
@@ -0,0 +1,220 @@
+import os
+
+import numpy as np
+
+from features import FEATURES, performance_score, risk_levels
+
+# Rows read from the students table (or a DataFrame) per training chunk
+TRAINING_CHUNK_SIZE = int(os.environ.get('MODEL_TRAINING_CHUNK_SIZE', 50000))
+# Columns read for training: the features, the target, then the stratum
+TRAINING_COLUMNS = FEATURES + ['performance', 'risk_level']
+
+def allocate(counts, max_rows):
+    """Rows of max_rows given to each stratum, in proportion to its count
+
+    Rows left over by rounding go to the largest remainders. With max_rows
+    0, or no more rows than that, every stratum keeps all its rows (None).
+    """
+    total = sum(counts.values())
+    if not max_rows or total <= max_rows:
+        return {stratum: None for stratum in counts}
+    quotas = {stratum: max_rows * n / total for stratum, n in counts.items()}
+    shares = {stratum: int(quota) for stratum, quota in quotas.items()}
+    leftover = max_rows - sum(shares.values())
+    for stratum in sorted(quotas, key=lambda s: quotas[s] - shares[s], reverse=True)[:leftover]:
+        shares[stratum] += 1
+    return shares
+
+class _Reservoir:
+    """Uniform sample of up to capacity rows of one stratum (Algorithm R)
+
+    capacity None keeps every row. Otherwise the buffers are allocated once
+    at capacity and later rows replace random slots with probability
+    capacity / rows seen, so memory never grows past capacity rows.
+    """
+
+    def __init__(self, capacity, rng):
+        self.capacity = capacity
+        self.rng = rng
+        self.seen = 0
+        # Chunks kept whole when capacity is None
+        self.parts = []
+        self.X = self.y = None
+
+    def add(self, X, y):
+        if self.capacity is None:
+            self.parts.append((X, y))
+            self.seen += len(y)
+            return
+        if self.capacity == 0:
+            self.seen += len(y)
+            return
+        if self.X is None:
+            self.X = np.empty((self.capacity, X.shape[1]), dtype=np.float32)
+            self.y = np.empty(self.capacity, dtype=np.float64)
+
+        fill = max(min(self.capacity - self.seen, len(y)), 0)
+        self.X[self.seen:self.seen + fill] = X[:fill]
+        self.y[self.seen:self.seen + fill] = y[:fill]
+        self.seen += fill
+        if fill == len(y):
+            return
+
+        # Row number t (1-based) of each remaining row in the stratum
+        t = self.seen + np.arange(1, len(y) - fill + 1)
+        accepted = fill + np.flatnonzero(self.rng.random(len(t)) * t < self.capacity)
+        slots = self.rng.integers(0, self.capacity, len(accepted))
+        # Replacements apply in row order, so of rows drawing the same slot
+        # only the last survives
+        _, last = np.unique(slots[::-1], return_index=True)
+        keep = len(slots) - 1 - last
+        self.X[slots[keep]] = X[accepted[keep]]
+        self.y[slots[keep]] = y[accepted[keep]]
+        self.seen += len(t)
+
+    def arrays(self):
+        if self.capacity is None:
+            if not self.parts:
+                return None, None
+            return (np.concatenate([X for X, _ in self.parts]),
+                    np.concatenate([y for _, y in self.parts]))
+        if self.X is None:
+            return None, None
+        size = min(self.seen, self.capacity)
+        return self.X[:size], self.y[:size]
+
+class TrainingSample:
+    """Training rows streamed in chunks into a bounded, stratified sample
+
+    Rows are stratified by risk level and each stratum keeps a uniform
+    reservoir sized by allocate() from the expected counts, so the sample
+    keeps the table's risk mix instead of leaving the small High risk
+    group to chance. Features are held as float32 and only the sampled
+    rows are kept, so memory is bounded by max_rows whatever the table
+    size. The scaler is partial_fit on every chunk, so its mean and
+    variance cover all rows, not only the sample.
+    """
+
+    def __init__(self, counts, max_rows, random_state=None):
+        from sklearn.preprocessing import StandardScaler
+
+        self.scaler = StandardScaler()
+        self.max_rows = max_rows
+        # Rows added, sampled or not
+        self.rows = 0
+        self.rng = np.random.default_rng(random_state)
+        self.reservoirs = {
+            stratum: _Reservoir(capacity, self.rng)
+            for stratum, capacity in allocate(counts, max_rows).items()
+        }
+
+    def add(self, X, y, strata):
+        """Add a chunk: FEATURES matrix, performance (NaN: derived) and strata"""
+        X = np.asarray(X, dtype=np.float32)
+        y = np.array(y, dtype=np.float64)
+        missing = np.isnan(y)
+        if missing.any():
+            y[missing] = performance_score(*X[missing].T.astype(np.float64))
+        self.scaler.partial_fit(X)
+        self.rows += len(y)
+
+        strata = np.asarray(strata, dtype=object)
+        for stratum in set(strata.tolist()):
+            if stratum not in self.reservoirs:
+                # Not counted up front (written since): kept only when unbounded
+                self.reservoirs[stratum] = _Reservoir(None if not self.max_rows else 0, self.rng)
+            rows = strata == stratum
+            self.reservoirs[stratum].add(X[rows], y[rows])
+
+    def arrays(self):
+        """The sampled (X float32, y float64), unscaled"""
+        parts = [reservoir.arrays() for reservoir in self.reservoirs.values()]
+        parts = [(X, y) for X, y in parts if X is not None]
+        if not parts:
+            return np.empty((0, len(FEATURES)), dtype=np.float32), np.empty(0)
+        return np.concatenate([X for X, _ in parts]), np.concatenate([y for _, y in parts])
+
+class UploadSample:
+    """Uniform sample of an upload's rows for warm starts, plus their count
+
+    Keeps FEATURES (float32) and performance of at most capacity rows in
+    one reservoir (capacity None: every row; 0: count only), so ingesting
+    a large file does not hold its model columns in memory.
+    """
+
+    def __init__(self, capacity, random_state=None):
+        # Rows added, sampled or not
+        self.rows = 0
+        self.reservoir = _Reservoir(capacity, np.random.default_rng(random_state))
+
+    def add(self, df):
+        """Add a chunk holding FEATURES and performance"""
+        self.rows += len(df)
+        self.reservoir.add(df[FEATURES].to_numpy(dtype=np.float32),
+                           df['performance'].to_numpy(dtype=np.float64))
+
+    def arrays(self):
+        """The sampled (X float32, y float64)"""
+        X, y = self.reservoir.arrays()
+        if X is None:
+            return np.empty((0, len(FEATURES)), dtype=np.float32), np.empty(0)
+        return X, y
+
+def sample_frame(df, max_rows, random_state=None, chunk_size=TRAINING_CHUNK_SIZE):
+    """TrainingSample of a DataFrame holding FEATURES and performance
+
+    Strata are the risk levels of performance, counted in a first pass
+    over the chunks, so nothing beyond one chunk is copied out of df.
+    """
+    def chunks():
+        for start in range(0, len(df), chunk_size):
+            part = df.iloc[start:start + chunk_size]
+            X = part[FEATURES].to_numpy(dtype=np.float64)
+            y = part['performance'].to_numpy(dtype=np.float64)
+            y = np.where(np.isnan(y), performance_score(*X.T), y)
+            yield X, y, risk_levels(y)
+
+    counts = {}
+    for _, _, strata in chunks():
+        labels, label_counts = np.unique(strata, return_counts=True)
+        for label, n in zip(labels.tolist(), label_counts.tolist()):
+            counts[label] = counts.get(label, 0) + n
+    sample = TrainingSample(counts, max_rows, random_state)
+    for X, y, strata in chunks():
+        sample.add(X, y, strata)
+    return sample
+
+def sample_store(store, max_rows, random_state=None, chunk_size=TRAINING_CHUNK_SIZE):
+    """TrainingSample of a snapshot or Arrow store, read in batches
+
+    Stratum counts come from the store's risk_level counts and rows from
+    its batches(), so at most one batch is held outside the sample.
+    """
+    sample = TrainingSample(store.category_counts('risk_level'), max_rows, random_state)
+    for batch in store.batches(TRAINING_COLUMNS, chunk_size):
+        X = np.column_stack([batch[col] for col in FEATURES])
+        sample.add(X, batch['performance'], batch['risk_level'])
+    return sample
+
+def sample_table(conn, max_rows, random_state=None, chunk_size=TRAINING_CHUNK_SIZE):
+    """TrainingSample of the students table, read chunk by chunk
+
+    Only TRAINING_COLUMNS are read, and at most one chunk of rows is held
+    outside the sample at a time. Run it in one read transaction so the
+    stratum counts and the rows agree.
+    """
+    counts = dict(conn.execute(
+        "SELECT risk_level, COUNT(*) FROM students GROUP BY risk_level"
+    ).fetchall())
+    sample = TrainingSample(counts, max_rows, random_state)
+    cursor = conn.execute(f"SELECT {', '.join(TRAINING_COLUMNS)} FROM students")
+    try:
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            values = np.array([row[:-1] for row in rows], dtype=np.float64)
+            sample.add(values[:, :-1], values[:, -1], [row[-1] for row in rows])
+    finally:
+        cursor.close()
+    return sample
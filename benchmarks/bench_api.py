@@ -0,0 +1,200 @@
+"""Benchmark suite: the Flask API end to end at several dataset sizes
+
+Generates seeded synthetic cohorts with data/generate_students.py, uploads
+each one into a throwaway database and model registry through the Flask
+test client (no live server), then times the read and prediction routes.
+Results are written as JSON; pass --compare with an earlier result file to
+print the change per route and size.
+
+    python benchmarks/bench_api.py --sizes 10000 100000 -o results.json
+    python benchmarks/bench_api.py --compare baseline.json
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (os.path.join(base_dir, 'backend'), os.path.join(base_dir, 'data')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from generate_students import generate_students
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+# Requests per read route and size; predict uses PREDICT_REQUESTS distinct inputs
+DEFAULT_REPEATS = 5
+PREDICT_REQUESTS = 200
+BATCH_ROWS = 1000
+TRAINING_TIMEOUT = 1800
+
+# (name, method, url) of the routes timed after each upload
+READ_ROUTES = [
+    ('dashboard', 'GET', '/api/dashboard'),
+    ('analytics', 'GET', '/api/analytics'),
+    ('students_page', 'GET', '/api/students?limit=100'),
+    ('students_search', 'GET', '/api/students?limit=100&q=Eng&sort=performance&order=desc'),
+    ('students_ndjson', 'GET', '/api/students?format=ndjson'),
+    ('export', 'GET', '/api/export'),
+]
+
+def make_app(workdir):
+    """Import the app against a database and registry inside workdir"""
+    os.environ['STUDENT_DB_PATH'] = os.path.join(workdir, 'students.db')
+    os.environ['MODEL_REGISTRY_DIR'] = os.path.join(workdir, 'models')
+    # Refit on every upload so training time tracks table size
+    os.environ.setdefault('MODEL_TRAINING_POLICY', 'full')
+    import app as app_module
+    return app_module
+
+def summarize(times, nbytes=None):
+    """Latency statistics in milliseconds"""
+    ms = np.array(times) * 1e3
+    result = {
+        'requests': len(ms),
+        'min_ms': round(float(ms.min()), 3),
+        'median_ms': round(float(np.median(ms)), 3),
+        'p95_ms': round(float(np.percentile(ms, 95)), 3),
+    }
+    if nbytes is not None:
+        result['bytes'] = nbytes
+    return result
+
+def timed_request(client, method, url, **kwargs):
+    """Issue a request, read the whole body and return (seconds, response, body)"""
+    start = time.perf_counter()
+    response = client.open(url, method=method, **kwargs)
+    body = response.get_data()
+    elapsed = time.perf_counter() - start
+    if response.status_code != 200:
+        raise RuntimeError(f'{method} {url} returned {response.status_code}: {body[:200]!r}')
+    return elapsed, response, body
+
+def wait_for_training(client, job_id):
+    """Poll a training job until it finishes; returns its record"""
+    deadline = time.time() + TRAINING_TIMEOUT
+    while time.time() < deadline:
+        job = client.get(f'/api/train/status/{job_id}').get_json()
+        if job['status'] in ('completed', 'failed'):
+            return job
+        time.sleep(0.05)
+    raise RuntimeError(f'Training job {job_id} did not finish in {TRAINING_TIMEOUT}s')
+
+def bench_size(app_module, n, seed, repeats):
+    """Upload n students and time every route; returns {route: stats}"""
+    from database import clear_data
+
+    client = app_module.app.test_client()
+    clear_data()
+    df = generate_students(n, seed)
+    csv_bytes = df.to_csv(index=False).encode()
+
+    results = {}
+    elapsed, _, body = timed_request(
+        client, 'POST', '/api/upload',
+        data={'file': (io.BytesIO(csv_bytes), 'students.csv')},
+        content_type='multipart/form-data'
+    )
+    results['upload'] = summarize([elapsed], len(csv_bytes))
+    job = wait_for_training(client, json.loads(body)['training_job_id'])
+    if job['status'] != 'completed':
+        raise RuntimeError(f"Training failed: {job['error']}")
+    results['train'] = summarize([job['finished_at'] - job['started_at']])
+
+    for name, method, url in READ_ROUTES:
+        runs = [timed_request(client, method, url) for _ in range(repeats)]
+        results[name] = summarize([r[0] for r in runs], len(runs[-1][2]))
+
+    # Distinct inputs so the prediction cache does not serve every request
+    rng = np.random.default_rng(seed)
+    features = app_module.PREDICTION_FIELDS
+    inputs = np.column_stack([
+        rng.uniform(40, 100, PREDICT_REQUESTS), rng.uniform(5, 30, PREDICT_REQUESTS),
+        rng.uniform(40, 100, PREDICT_REQUESTS), rng.uniform(50, 100, PREDICT_REQUESTS),
+        rng.integers(1, 4, PREDICT_REQUESTS)
+    ]).round(1)
+    payloads = [dict(zip(features, row)) for row in inputs.tolist()]
+    results['predict'] = summarize([
+        timed_request(client, 'POST', '/api/predict', json=payload)[0] for payload in payloads
+    ])
+    results['predict_cached'] = summarize([
+        timed_request(client, 'POST', '/api/predict', json=payloads[0])[0]
+        for _ in range(PREDICT_REQUESTS)
+    ])
+
+    batch = [dict(zip(features, inputs[i % PREDICT_REQUESTS].tolist())) for i in range(BATCH_ROWS)]
+    runs = [timed_request(client, 'POST', '/api/predict/batch', json=batch) for _ in range(repeats)]
+    results['predict_batch'] = summarize([r[0] for r in runs], len(runs[-1][2]))
+    return results
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=base_dir, text=True,
+            stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(current, baseline):
+    """Print median latency per route and size against a baseline result"""
+    print(f"\n{'size':>8} {'route':<18} {'baseline ms':>12} {'current ms':>11} {'change':>8}")
+    for size, routes in current['results'].items():
+        for route, stats in routes.items():
+            old = baseline['results'].get(size, {}).get(route)
+            if old is None:
+                continue
+            change = stats['median_ms'] / old['median_ms'] - 1 if old['median_ms'] else 0
+            print(f"{size:>8} {route:<18} {old['median_ms']:>12.2f} "
+                  f"{stats['median_ms']:>11.2f} {change:>+7.0%}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--repeats', type=int, default=DEFAULT_REPEATS)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('-o', '--output', help='write results to this JSON file')
+    parser.add_argument('--compare', help='earlier result file to compare against')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix='bench-api-') as workdir:
+        app_module = make_app(workdir)
+        report = {
+            'meta': {
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                'commit': git_commit(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpus': os.cpu_count(),
+                'seed': args.seed,
+                'repeats': args.repeats,
+                'training_policy': os.environ['MODEL_TRAINING_POLICY'],
+            },
+            'results': {}
+        }
+        print(f"{'size':>8} {'route':<18} {'median ms':>10} {'p95 ms':>10} {'bytes':>12}")
+        for n in args.sizes:
+            results = bench_size(app_module, n, args.seed, args.repeats)
+            report['results'][str(n)] = results
+            for route, stats in results.items():
+                print(f"{n:>8} {route:<18} {stats['median_ms']:>10.2f} "
+                      f"{stats['p95_ms']:>10.2f} {stats.get('bytes', ''):>12}")
+        app_module.training_worker.executor.shutdown(wait=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Microbenchmark: per-row vs vectorized feature engineering
+
+Compares the old per-row code paths (Series.apply for risk labels,
+DataFrame.iterrows for scatter points) with backend/features.py at
+several table sizes.
+
+    python benchmarks/bench_features.py [rows ...]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+backend_dir = os.path.join(base_dir, 'backend')
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from features import risk_levels, scatter_points
+
+DEFAULT_SIZES = [7000, 100000, 1000000]
+
+def make_frame(n, seed=42):
+    """Random performance/attendance columns for n students"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'attendance': rng.uniform(40, 100, n).round(1),
+        'performance': rng.uniform(20, 100, n)
+    })
+
+def risk_apply(df):
+    return df['performance'].apply(
+        lambda x: 'Low' if x >= 70 else 'Medium' if x >= 50 else 'High'
+    )
+
+def risk_vectorized(df):
+    return risk_levels(df['performance'])
+
+def points_iterrows(df):
+    return [{'x': row['attendance'], 'y': row['performance']} for _, row in df.iterrows()]
+
+def points_vectorized(df):
+    return scatter_points(df['attendance'], df['performance'])
+
+def best_of(fn, df, repeats):
+    """Best wall-clock time of fn(df) over repeats runs"""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(df)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def main(sizes):
+    print(f"{'rows':>10} {'benchmark':<14} {'per-row (s)':>12} {'vectorized (s)':>15} {'speedup':>9}")
+    for n in sizes:
+        df = make_frame(n)
+        assert (risk_apply(df).to_numpy() == risk_vectorized(df)).all()
+        repeats = 5 if n <= 100000 else 1
+        for name, slow, fast in (('risk_level', risk_apply, risk_vectorized),
+                                 ('scatter', points_iterrows, points_vectorized)):
+            t_slow = best_of(slow, df, repeats)
+            t_fast = best_of(fast, df, repeats)
+            print(f"{n:>10} {name:<14} {t_slow:>12.4f} {t_fast:>15.4f} {t_slow / t_fast:>8.1f}x")
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,62 @@
+"""Benchmark: sklearn RandomForestRegressor vs the compiled NumPy forest
+
+Trains the default 100-tree model on data/student_data_7000.csv, compiles
+it with backend/forest.py and times both paths at several batch sizes.
+
+    python benchmarks/bench_inference.py [rows ...]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.preprocessing import StandardScaler
+
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+backend_dir = os.path.join(base_dir, 'backend')
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from features import feature_matrix, performance_from_frame
+from forest import compile_forest
+
+DEFAULT_SIZES = [1, 10, 100, 1000, 10000, 100000]
+DATA_FILE = os.path.join(base_dir, 'data', 'student_data_7000.csv')
+
+def best_of(fn, repeats):
+    """Best wall-clock time of fn() over repeats runs"""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def main(sizes):
+    df = pd.read_csv(DATA_FILE)
+    X = feature_matrix(df)
+    y = performance_from_frame(df).to_numpy()
+
+    scaler = StandardScaler()
+    model = RandomForestRegressor(n_estimators=100, random_state=42)
+    model.fit(scaler.fit_transform(X), y)
+
+    start = time.perf_counter()
+    forest = compile_forest(model, scaler)
+    print(f"Compiled {forest.n_trees} trees ({len(forest.feature)} nodes, "
+          f"depth {forest.depth}) in {time.perf_counter() - start:.3f}s\n")
+
+    rng = np.random.default_rng(0)
+    print(f"{'rows':>8} {'sklearn (ms)':>13} {'compiled (ms)':>14} {'speedup':>9} {'max |diff|':>11}")
+    for n in sizes:
+        batch = X[rng.integers(0, len(X), n)]
+        repeats = 20 if n <= 1000 else 3
+        t_sk = best_of(lambda: model.predict(scaler.transform(batch)), repeats)
+        t_cf = best_of(lambda: forest.predict(batch), repeats)
+        diff = np.abs(model.predict(scaler.transform(batch)) - forest.predict(batch)).max()
+        print(f"{n:>8} {t_sk * 1e3:>13.3f} {t_cf * 1e3:>14.3f} {t_sk / t_cf:>8.1f}x {diff:>11.2e}")
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
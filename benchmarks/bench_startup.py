@@ -0,0 +1,93 @@
+"""Benchmark: cold start of the API process
+
+Publishes a model trained on a seeded synthetic cohort into a throwaway
+registry, then starts fresh interpreters and times importing backend/app.py,
+the first /api/status request, the first /api/predict (which loads the
+model) and warm_up(), the work a preloading gunicorn master does before
+forking. Also reports which heavy libraries the import pulled in.
+
+    python benchmarks/bench_startup.py --rows 50000 --repeats 10
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+backend_dir = os.path.join(base_dir, 'backend')
+data_dir = os.path.join(base_dir, 'data')
+
+HEAVY_MODULES = ['pandas', 'sklearn', 'joblib', 'pyarrow']
+
+# Run in a fresh interpreter per measurement; prints one JSON line
+PROBE = '''
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+loaded = [m for m in HEAVY if m in sys.modules]
+client = app.app.test_client()
+client.get('/api/status')
+status = time.perf_counter()
+client.post('/api/predict', json=dict.fromkeys(app.PREDICTION_FIELDS, 2))
+predict = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - start) * 1e3,
+    'first_status_ms': (status - imported) * 1e3,
+    'first_predict_ms': (predict - status) * 1e3,
+    'heavy_modules_at_import': loaded,
+}))
+'''
+
+WARM_UP_PROBE = '''
+import json, time
+import app
+start = time.perf_counter()
+app.warm_up()
+print(json.dumps({'warm_up_ms': (time.perf_counter() - start) * 1e3}))
+'''
+
+SETUP = '''
+import app
+from generate_students import generate_students
+from features import performance_from_frame
+app.initialize()
+df = generate_students(ROWS, schema='simple')
+df['performance'] = performance_from_frame(df)
+app.student_model.train(df)
+'''
+
+def run_python(code, env):
+    out = subprocess.check_output([sys.executable, '-c', code], cwd=backend_dir, env=env, text=True)
+    return json.loads(out.splitlines()[-1]) if out.strip() else None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000, help='rows the served model is trained on')
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix='bench-startup-') as workdir:
+        env = dict(
+            os.environ,
+            STUDENT_DB_PATH=os.path.join(workdir, 'students.db'),
+            MODEL_REGISTRY_DIR=os.path.join(workdir, 'models'),
+            PYTHONPATH=os.pathsep.join([backend_dir, data_dir]),
+        )
+        run_python(f'ROWS = {args.rows}\n' + SETUP, env)
+
+        runs = [run_python(f'HEAVY = {HEAVY_MODULES!r}\n' + PROBE, env) for _ in range(args.repeats)]
+        warm_ups = [run_python(WARM_UP_PROBE, env)['warm_up_ms'] for _ in range(args.repeats)]
+
+    print(f"Model trained on {args.rows} rows; median of {args.repeats} fresh processes\n")
+    for key in ('import_ms', 'first_status_ms', 'first_predict_ms'):
+        print(f"{key:<20} {np.median([run[key] for run in runs]):>9.1f}")
+    print(f"{'warm_up_ms':<20} {np.median(warm_ups):>9.1f}")
+    print(f"\nHeavy modules loaded by import: {', '.join(runs[0]['heavy_modules_at_import']) or 'none'}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""Benchmark: forest training time against held-out accuracy
+
+Fits the model on a seeded synthetic cohort (data/generate_students.py) with
+a grid of training configurations and reports, per configuration, the fit
+time, R² on a held-out split, forest size and compiled batch predict time,
+so model size can be traded for speed. Gaussian noise (--noise points of
+performance) is added to the target, which is otherwise an exact function
+of the features and would let every configuration score R² ~ 1.
+
+    python benchmarks/bench_training.py --rows 200000 -o training.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (os.path.join(base_dir, 'backend'), os.path.join(base_dir, 'data')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from generate_students import generate_students
+from features import feature_matrix, performance_from_frame
+from forest import compile_forest
+from model import RANDOM_STATE, forest_params
+from training_data import sample_frame
+
+DEFAULT_ROWS = 100000
+TEST_FRACTION = 0.2
+PREDICT_ROWS = 10000
+
+# (name, forest_params overrides, max training rows)
+CONFIGS = [
+    ('default_1core', {'n_jobs': 1}, 0),
+    ('default', {}, 0),
+    ('trees_50', {'n_estimators': 50}, 0),
+    ('depth_12', {'max_depth': 12}, 0),
+    ('depth_8', {'max_depth': 8}, 0),
+    ('max_samples_0.2', {'max_samples': 0.2}, 0),
+    ('trees_50_depth_12_ms_0.2', {'n_estimators': 50, 'max_depth': 12, 'max_samples': 0.2}, 0),
+    ('rows_20000', {}, 20000),
+]
+
+def fit(train, params, max_rows):
+    """Fit like StudentModel.train; returns (seconds, compiled forest)"""
+    from sklearn.ensemble import RandomForestRegressor
+
+    start = time.perf_counter()
+    sample = sample_frame(train, max_rows, RANDOM_STATE)
+    X, y = sample.arrays()
+    model = RandomForestRegressor(**params)
+    model.fit(sample.scaler.transform(X, copy=False), y)
+    elapsed = time.perf_counter() - start
+    return elapsed, compile_forest(model, sample.scaler)
+
+def r2_score(y_true, y_pred):
+    return 1 - np.sum((y_true - y_pred) ** 2) / np.sum((y_true - y_true.mean()) ** 2)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=DEFAULT_ROWS)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--noise', type=float, default=5.0)
+    parser.add_argument('-o', '--output', help='write results to this JSON file')
+    args = parser.parse_args(argv)
+
+    df = generate_students(args.rows, args.seed, schema='simple')
+    rng = np.random.default_rng(args.seed)
+    df['performance'] = performance_from_frame(df) + rng.normal(0, args.noise, len(df))
+    test = rng.random(len(df)) < TEST_FRACTION
+    train = df[~test]
+    X_test, y_test = feature_matrix(df[test]), df.loc[test, 'performance'].to_numpy()
+    batch = X_test[:PREDICT_ROWS]
+
+    print(f"{len(train)} training rows, {len(X_test)} held out, {os.cpu_count()} cpus\n")
+    print(f"{'config':<26} {'fit s':>8} {'R2':>7} {'nodes':>10} {'depth':>6} {'predict ms':>11}")
+    results = {}
+    for name, overrides, max_rows in CONFIGS:
+        params = forest_params(**overrides)
+        elapsed, forest = fit(train, params, max_rows)
+        score = r2_score(y_test, forest.predict(X_test))
+        start = time.perf_counter()
+        forest.predict(batch)
+        predict_ms = (time.perf_counter() - start) * 1e3
+        results[name] = {
+            'params': params,
+            'max_training_rows': max_rows,
+            'fit_seconds': round(elapsed, 3),
+            'r2': round(float(score), 4),
+            'nodes': len(forest.feature),
+            'depth': forest.depth,
+            'predict_ms': round(predict_ms, 3),
+        }
+        print(f"{name:<26} {elapsed:>8.2f} {score:>7.4f} {len(forest.feature):>10} "
+              f"{forest.depth:>6} {predict_ms:>11.2f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'rows': args.rows, 'seed': args.seed, 'noise': args.noise,
+                       'cpus': os.cpu_count(), 'results': results}, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+if __name__ == '__main__':
+    main()
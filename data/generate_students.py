@@ -0,0 +1,141 @@
+"""Synthetic student dataset generator
+
+Vectorized with NumPy, so it produces millions of rows in seconds, and
+seeded, so the same (n, seed) always yields the same file. Two layouts:
+
+    full   - the demographic upload format (StudentID, AttendanceRate, ...,
+             FamilyIncome) with GPA on a 4.0 scale and 0-100 participation
+    simple - the original six-column layout of student_data_7000.csv
+
+    python data/generate_students.py 1000000 -o students_1m.csv --seed 7
+"""
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Rows generated and written per chunk; part of the seed contract, since
+# each chunk draws from the generator in turn
+CHUNK_SIZE = 500000
+
+# name: (share of students, attendance, study hours, previous grades,
+#        assignments, participation levels)
+PROFILES = {
+    'excellent': (0.20, (85, 100), (20, 30), (80, 100), (85, 100), (2, 3)),
+    'good': (0.35, (75, 90), (15, 25), (70, 85), (75, 90), (2, 3)),
+    'average': (0.30, (65, 80), (10, 20), (60, 75), (65, 80), (1, 2, 3)),
+    'struggling': (0.15, (40, 70), (5, 15), (40, 65), (50, 70), (1, 2)),
+}
+
+# 0-100 participation score range behind each level (matches ingest's buckets)
+PARTICIPATION_SCORES = {1: (30, 59.9), 2: (60, 84.9), 3: (85, 100)}
+
+# Demographic columns: (values, probabilities)
+DEMOGRAPHICS = {
+    'Major': (['Computer Science', 'Engineering', 'Business', 'Biology',
+               'Psychology', 'Mathematics', 'Economics', 'English'],
+              [0.18, 0.16, 0.16, 0.12, 0.12, 0.09, 0.09, 0.08]),
+    'YearOfStudy': (['Freshman', 'Sophomore', 'Junior', 'Senior'],
+                    [0.28, 0.26, 0.24, 0.22]),
+    'Gender': (['Female', 'Male', 'Non-binary'], [0.50, 0.47, 0.03]),
+    'Ethnicity': (['Asian', 'Black', 'Hispanic', 'White', 'Other'],
+                  [0.15, 0.13, 0.20, 0.45, 0.07]),
+    'ParentEducation': (['High School', 'Some College', "Bachelor's",
+                         "Master's", 'Doctorate'],
+                        [0.25, 0.22, 0.30, 0.17, 0.06]),
+    'FamilyIncome': (['Low', 'Middle', 'High'], [0.30, 0.50, 0.20]),
+}
+
+FULL_COLUMNS = ['StudentID', 'AttendanceRate', 'StudyHoursPerWeek', 'PreviousGPA',
+                'AssignmentScore', 'ParticipationScore', *DEMOGRAPHICS]
+SIMPLE_COLUMNS = ['student_id', 'attendance', 'study_hours', 'previous_grades',
+                  'assignments_completed', 'participation']
+
+def _uniform(rng, bounds, profile):
+    """One uniform draw per row within the (low, high) bounds of its profile"""
+    low, high = (np.array(b, dtype=float)[profile] for b in zip(*bounds))
+    return low + (high - low) * rng.random(len(profile))
+
+def _student_ids(start, count, width):
+    ids = np.arange(start + 1, start + count + 1).astype(str)
+    return np.char.add('STU', np.char.zfill(ids, width))
+
+def _generate_chunk(rng, start, count, width, schema):
+    profiles = list(PROFILES.values())
+    profile = rng.choice(len(profiles), size=count, p=[p[0] for p in profiles])
+
+    attendance = _uniform(rng, [p[1] for p in profiles], profile)
+    study_hours = _uniform(rng, [p[2] for p in profiles], profile)
+    grades = _uniform(rng, [p[3] for p in profiles], profile)
+    assignments = _uniform(rng, [p[4] for p in profiles], profile)
+
+    # Pick one of each profile's allowed participation levels
+    options = [p[5] for p in profiles]
+    table = np.array([o + (0,) * (3 - len(o)) for o in options])
+    n_options = np.array([len(o) for o in options])
+    participation = table[profile, (rng.random(count) * n_options[profile]).astype(int)]
+
+    ids = _student_ids(start, count, width)
+    if schema == 'simple':
+        return pd.DataFrame({
+            'student_id': ids,
+            'attendance': attendance.round(1),
+            'study_hours': study_hours.round(1),
+            'previous_grades': grades.round(1),
+            'assignments_completed': assignments.round(1),
+            'participation': participation,
+        })
+
+    levels = sorted(PARTICIPATION_SCORES)
+    df = pd.DataFrame({
+        'StudentID': ids,
+        'AttendanceRate': attendance.round(1),
+        'StudyHoursPerWeek': study_hours.round(1),
+        'PreviousGPA': (grades / 25).round(2),
+        'AssignmentScore': assignments.round(1),
+        'ParticipationScore': _uniform(
+            rng, [PARTICIPATION_SCORES[level] for level in levels], participation - 1
+        ).round(1),
+    })
+    for column, (values, probabilities) in DEMOGRAPHICS.items():
+        df[column] = pd.Categorical.from_codes(
+            rng.choice(len(values), size=count, p=probabilities), values
+        )
+    return df
+
+def iter_students(n, seed=42, schema='full', chunk_size=CHUNK_SIZE):
+    """Yield DataFrames of synthetic students, chunk_size rows at a time"""
+    if schema not in ('full', 'simple'):
+        raise ValueError(f'Unknown schema: {schema}')
+    rng = np.random.default_rng(seed)
+    width = max(4, len(str(n)))
+    for start in range(0, n, chunk_size):
+        yield _generate_chunk(rng, start, min(chunk_size, n - start), width, schema)
+
+def generate_students(n, seed=42, schema='full'):
+    """Return n synthetic students as one DataFrame"""
+    chunks = list(iter_students(n, seed, schema))
+    if not chunks:
+        return pd.DataFrame(columns=FULL_COLUMNS if schema == 'full' else SIMPLE_COLUMNS)
+    return pd.concat(chunks, ignore_index=True)
+
+def write_csv(path_or_buffer, n, seed=42, schema='full'):
+    """Stream n synthetic students to a CSV file or buffer"""
+    for i, chunk in enumerate(iter_students(n, seed, schema)):
+        chunk.to_csv(path_or_buffer, index=False, header=i == 0, mode='w' if i == 0 else 'a')
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('n', type=int, help='number of students')
+    parser.add_argument('-o', '--output', help='CSV path (default: stdout)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--schema', choices=['full', 'simple'], default='full')
+    args = parser.parse_args(argv)
+
+    write_csv(args.output or sys.stdout, args.n, args.seed, args.schema)
+    if args.output:
+        print(f'Wrote {args.n} students to {args.output}', file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
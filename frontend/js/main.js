@@ -1,6 +1,9 @@
 const API_URL = window.location.origin + '/api';
 let charts = {};
 let allStudents = [];
+let studentCursor = null;
+let filterTimer = null;
+const STUDENT_PAGE_SIZE = 500;
 
 // Initialize
 // Initialize
@@ -257,15 +260,25 @@ async function loadAnalytics() {
 
 // --- Students List ---
 
-async function loadStudents() {
+async function loadStudents(append = false) {
+    const params = new URLSearchParams({ limit: STUDENT_PAGE_SIZE });
+    const search = document.getElementById('searchStudent').value.trim();
+    const risk = document.getElementById('riskFilter').value;
+    if (search) params.set('q', search);
+    if (risk) params.set('risk_level', risk);
+    if (append && studentCursor) params.set('cursor', studentCursor);
+
     try {
-        const response = await fetch(`${API_URL}/students`);
+        const response = await fetch(`${API_URL}/students?${params}`);
         const data = await response.json();
 
-        if (data.students && data.students.length > 0) {
-            allStudents = data.students;
-            renderStudentTable(allStudents);
+        if (data.students && (data.students.length > 0 || append)) {
+            allStudents = append ? allStudents.concat(data.students) : data.students;
+            studentCursor = data.next_cursor;
+            renderStudentTable(allStudents, data.total);
         } else {
+            allStudents = [];
+            studentCursor = null;
             document.getElementById('studentTable').innerHTML =
                 '<div class="alert alert-warning">⚠️ No student data available</div>';
         }
@@ -275,13 +288,10 @@ async function loadStudents() {
     }
 }
 
-function renderStudentTable(students) {
+function renderStudentTable(students, total) {
     const tableContainer = document.getElementById('studentTable');
 
-    // Pagination logic could go here, but for now we render all (capped or virtualized in real app)
-    // Limiting to first 100 for performance if list is huge
-    const displayStudents = students.slice(0, 500);
-
+    // Rows arrive one server-side page at a time; "Load more" fetches the next page
     let html = `
         <table>
             <thead>
@@ -299,7 +309,7 @@ function renderStudentTable(students) {
             <tbody>
     `;
 
-    displayStudents.forEach(s => {
+    students.forEach(s => {
         html += `
             <tr>
                 <td style="font-family: monospace; font-weight: 600;">${s.student_id}</td>
@@ -316,25 +326,21 @@ function renderStudentTable(students) {
 
     html += '</tbody></table>';
 
-    if (students.length > 500) {
-        html += `<div style="padding: 10px; text-align: center; color: #666;">Showing first 500 of ${students.length} students</div>`;
+    if (studentCursor) {
+        html += `
+            <div style="padding: 10px; text-align: center; color: #666;">
+                Showing ${students.length} of ${total} students
+                <button class="btn btn-secondary" onclick="loadStudents(true)">Load more</button>
+            </div>`;
     }
 
     tableContainer.innerHTML = html;
 }
 
 window.filterStudents = function () {
-    const searchTerm = document.getElementById('searchStudent').value.toLowerCase();
-    const riskFilter = document.getElementById('riskFilter').value;
-
-    const filtered = allStudents.filter(s => {
-        const matchesSearch = s.student_id.toLowerCase().includes(searchTerm) ||
-            (s.major && s.major.toLowerCase().includes(searchTerm));
-        const matchesRisk = riskFilter === '' || s.risk_level === riskFilter;
-        return matchesSearch && matchesRisk;
-    });
-
-    renderStudentTable(filtered);
+    // Debounce keystrokes so each search hits the server once
+    clearTimeout(filterTimer);
+    filterTimer = setTimeout(() => loadStudents(), 250);
 }
 
 window.exportData = function () {
@@ -423,8 +429,15 @@ function createScatterChart(canvasId, title, data, xLabel, yLabel) {
     const ctx = document.getElementById(canvasId);
     if (charts[canvasId]) charts[canvasId].destroy();
 
+    // Binned series carry a student count per cell: draw them as bubbles
+    const binned = data.length > 0 && data[0].count !== undefined;
+    if (binned) {
+        const maxCount = Math.max(...data.map(p => p.count));
+        data = data.map(p => ({ x: p.x, y: p.y, r: 2 + 10 * Math.sqrt(p.count / maxCount), count: p.count }));
+    }
+
     charts[canvasId] = new Chart(ctx, {
-        type: 'scatter',
+        type: binned ? 'bubble' : 'scatter',
         data: {
             datasets: [{
                 label: title,
@@ -435,7 +448,10 @@ function createScatterChart(canvasId, title, data, xLabel, yLabel) {
         options: {
             responsive: true,
             maintainAspectRatio: false,
-            plugins: { legend: { display: false } },
+            plugins: {
+                legend: { display: false },
+                tooltip: binned ? { callbacks: { label: c => `${c.raw.count} students` } } : {}
+            },
             scales: {
                 x: { title: { display: true, text: xLabel }, grid: { color: '#f1f5f9' } },
                 y: { title: { display: true, text: yLabel }, grid: { color: '#f1f5f9' } }
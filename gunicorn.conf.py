@@ -0,0 +1,21 @@
+"""Gunicorn settings, read automatically when gunicorn starts in this directory
+
+With GUNICORN_PRELOAD=1 (the default) the master imports the app and warms
+it up (schema, model, data libraries) before forking, so workers start with
+all of it already in memory and share those pages copy-on-write; respawned
+workers are ready at once. With GUNICORN_PRELOAD=0 each worker imports the
+app itself and warms up after booting, before it takes requests.
+"""
+import os
+
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+def when_ready(server):
+    if preload_app:
+        from app import warm_up
+        warm_up()
+
+def post_worker_init(worker):
+    # Also picks up a model published after the master warmed up
+    from app import warm_up
+    warm_up()